@@ -1,30 +1,19 @@
 """Quick cleanup: remove all failed/running pipeline runs, agent actions, and seed passing quality checks."""
-from src.config.db import execute_write
+from src.config.db import execute_write_fast
 
-# Clear failures
-execute_write("DELETE FROM pipeline_meta.pipeline_runs WHERE status IN ('failed', 'running')")
-execute_write("DELETE FROM pipeline_meta.agent_actions")
+# Everything runs as one transaction in a single round-trip, without waiting
+# for the commit fsync (demo data is disposable).
+# agent_actions and quality_results are not referenced by any other table, so
+# TRUNCATE is safe without CASCADE. They are cleared before pipeline_runs because
+# both hold FKs to it; reseed_quality_results() (data/sql/migrations.sql)
+# truncates quality_results and seeds passing results.
+execute_write_fast("""
+    TRUNCATE pipeline_meta.agent_actions RESTART IDENTITY;
+    TRUNCATE pipeline_meta.fix_cache;
 
-# Clear and reseed quality results with passing checks
-# Actual values must be BELOW thresholds for max checks, ABOVE for min checks
-execute_write("DELETE FROM pipeline_meta.quality_results;")
-execute_write("""
-    INSERT INTO pipeline_meta.quality_results (check_id, status, actual_value, expected_value, checked_at, details)
-    SELECT 
-        check_id,
-        'pass',
-        CASE 
-            WHEN threshold_type = 'max_percent' THEN GREATEST(0, threshold_value - 1.0)
-            WHEN threshold_type = 'min_count' THEN threshold_value + 100
-            WHEN threshold_type = 'max_age_hours' THEN GREATEST(0.5, threshold_value - 2.0)
-            WHEN threshold_type = 'max_count' THEN GREATEST(0, threshold_value - 1)
-            ELSE 0
-        END,
-        threshold_value,
-        NOW() - INTERVAL '30 minutes',
-        '{"status": "healthy"}'::jsonb
-    FROM pipeline_meta.data_quality_checks
-    WHERE is_active = true;
+    SELECT pipeline_meta.reseed_quality_results();
+
+    DELETE FROM pipeline_meta.pipeline_runs WHERE status IN ('failed', 'running');
 """)
 
 print("Done. All failures cleared, quality checks seeded as passing.")
@@ -11,54 +11,106 @@ Usage:
 import argparse
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from src.config.db import execute_query, execute_write
+from src.config.db import execute_query, execute_write_fast
+
+
+# Each scenario is a single script so it runs as one transaction and one
+# round-trip; --scenario all concatenates them into a single transaction.
+# Demo data is disposable, so every write here uses execute_write_fast and
+# skips the commit fsync.
+
+SCHEMA_DRIFT_SQL = """
+    -- Add new column
+    ALTER TABLE raw.orders ADD COLUMN IF NOT EXISTS discount_amount DECIMAL(10,2) DEFAULT 0.00;
+
+    -- Populate ~30% of rows; the rest keep the column DEFAULT, which PG11+
+    -- stores without rewriting the table, so only changed rows are touched
+    UPDATE raw.orders SET discount_amount = (total_amount * random() * 0.2)::decimal(10,2)
+    WHERE random() > 0.7;
+
+    -- Log a failed pipeline run for stg_orders
+    INSERT INTO pipeline_meta.pipeline_runs
+        (pipeline_id, status, started_at, completed_at, duration_seconds, error_message)
+    VALUES (
+        (SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = 'stg_orders'),
+        'failed',
+        NOW() - INTERVAL '1 minute',
+        NOW(),
+        60,
+        'Compilation Error in model stg_orders: column "discount_amount" referenced in downstream mart_revenue_daily does not exist in stg_orders output.'
+    );
+
+    -- Also fail downstream
+    INSERT INTO pipeline_meta.pipeline_runs
+        (pipeline_id, status, started_at, completed_at, duration_seconds, error_message)
+    VALUES (
+        (SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = 'mart_revenue_daily'),
+        'failed',
+        NOW() - INTERVAL '30 seconds',
+        NOW(),
+        30,
+        'Database Error: column "discount_amount" does not exist. Upstream dependency stg_orders may have schema changes.'
+    );
+"""
+
+DATA_QUALITY_SQL = """
+    -- Null out the most recent order amounts (idx_orders_order_date)
+    UPDATE raw.orders o
+    SET total_amount = NULL
+    FROM (
+        SELECT order_id FROM raw.orders
+        ORDER BY order_date DESC
+        LIMIT 75
+    ) recent
+    WHERE o.order_id = recent.order_id;
+
+    -- Log the run and record its quality check failure, linked via RETURNING
+    WITH run AS (
+        INSERT INTO pipeline_meta.pipeline_runs
+            (pipeline_id, status, started_at, completed_at, duration_seconds, row_count)
+        VALUES (
+            (SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = 'stg_orders'),
+            'success',
+            NOW() - INTERVAL '15 minutes',
+            NOW() - INTERVAL '12 minutes',
+            180,
+            500
+        )
+        RETURNING run_id
+    )
+    INSERT INTO pipeline_meta.quality_results
+        (check_id, run_id, status, actual_value, expected_value, details)
+    SELECT
+        (SELECT check_id FROM pipeline_meta.data_quality_checks WHERE check_name = 'orders_amount_not_null'),
+        run.run_id,
+        'fail',
+        15.0,
+        5.0,
+        '{"null_count": 75, "total_rows": 500, "null_percent": 15.0, "threshold": 5.0}'::jsonb
+    FROM run;
+"""
+
+SLA_BREACH_SQL = """
+    INSERT INTO pipeline_meta.pipeline_runs
+        (pipeline_id, status, started_at, completed_at, duration_seconds, row_count)
+    VALUES (
+        (SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = 'mart_customer_orders'),
+        'running',
+        NOW() - INTERVAL '65 minutes',
+        NULL,
+        3900,
+        NULL
+    );
+"""
 
 
 def inject_schema_drift():
     """Scenario 1: Add an unexpected column to raw.orders, simulating upstream schema change."""
     print("[INJECT] Schema drift: Adding 'discount_amount' column to raw.orders...")
 
-    # Add new column
-    execute_write("""
-        ALTER TABLE raw.orders ADD COLUMN IF NOT EXISTS discount_amount DECIMAL(10,2) DEFAULT 0.00;
-    """)
-
-    # Populate with some data
-    execute_write("""
-        UPDATE raw.orders SET discount_amount = CASE
-            WHEN random() > 0.7 THEN (total_amount * random() * 0.2)::decimal(10,2)
-            ELSE 0.00
-        END;
-    """)
-
-    # Log a failed pipeline run for stg_orders
-    execute_write("""
-        INSERT INTO pipeline_meta.pipeline_runs
-            (pipeline_id, status, started_at, completed_at, duration_seconds, error_message)
-        VALUES (
-            (SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = 'stg_orders'),
-            'failed',
-            NOW() - INTERVAL '1 minute',
-            NOW(),
-            60,
-            'Compilation Error in model stg_orders: column "discount_amount" referenced in downstream mart_revenue_daily does not exist in stg_orders output.'
-        );
-    """)
-
-    # Also fail downstream
-    execute_write("""
-        INSERT INTO pipeline_meta.pipeline_runs
-            (pipeline_id, status, started_at, completed_at, duration_seconds, error_message)
-        VALUES (
-            (SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = 'mart_revenue_daily'),
-            'failed',
-            NOW() - INTERVAL '30 seconds',
-            NOW(),
-            30,
-            'Database Error: column "discount_amount" does not exist. Upstream dependency stg_orders may have schema changes.'
-        );
-    """)
+    execute_write_fast(SCHEMA_DRIFT_SQL)
 
     print("   Done. raw.orders now has 'discount_amount' column.")
     print("   Done. stg_orders and mart_revenue_daily marked as FAILED.")
@@ -68,44 +120,7 @@ def inject_data_quality_issue():
     """Scenario 2: Inject nulls into critical fields."""
     print("[INJECT] Data quality issue: Setting NULL total_amount on recent orders...")
 
-    # Null out some order amounts
-    execute_write("""
-        UPDATE raw.orders
-        SET total_amount = NULL
-        WHERE order_id IN (
-            SELECT order_id FROM raw.orders
-            ORDER BY order_date DESC
-            LIMIT 75
-        );
-    """)
-
-    # Log quality check failure
-    execute_write("""
-        INSERT INTO pipeline_meta.pipeline_runs
-            (pipeline_id, status, started_at, completed_at, duration_seconds, row_count)
-        VALUES (
-            (SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = 'stg_orders'),
-            'success',
-            NOW() - INTERVAL '15 minutes',
-            NOW() - INTERVAL '12 minutes',
-            180,
-            500
-        );
-    """)
-
-    # Record quality check failure
-    execute_write("""
-        INSERT INTO pipeline_meta.quality_results
-            (check_id, run_id, status, actual_value, expected_value, details)
-        VALUES (
-            (SELECT check_id FROM pipeline_meta.data_quality_checks WHERE check_name = 'orders_amount_not_null'),
-            (SELECT MAX(run_id) FROM pipeline_meta.pipeline_runs),
-            'fail',
-            15.0,
-            5.0,
-            '{"null_count": 75, "total_rows": 500, "null_percent": 15.0, "threshold": 5.0}'::jsonb
-        );
-    """)
+    execute_write_fast(DATA_QUALITY_SQL)
 
     print("   Done. 75 orders now have NULL total_amount (15% null rate, threshold is 5%).")
     print("   Done. Data quality check recorded as FAILED.")
@@ -115,72 +130,79 @@ def inject_sla_breach():
     """Scenario 3: Simulate a pipeline running way over SLA."""
     print("[INJECT] SLA breach: mart_customer_orders running 3x over SLA...")
 
-    execute_write("""
-        INSERT INTO pipeline_meta.pipeline_runs
-            (pipeline_id, status, started_at, completed_at, duration_seconds, row_count)
-        VALUES (
-            (SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = 'mart_customer_orders'),
-            'running',
-            NOW() - INTERVAL '65 minutes',
-            NULL,
-            3900,
-            NULL
-        );
-    """)
+    execute_write_fast(SLA_BREACH_SQL)
 
     print("   Done. mart_customer_orders has been 'running' for 65 min (SLA: 20 min).")
 
 
-def reset_demo():
-    """Reset all injected failures back to clean state."""
-    print("[RESET] Resetting demo state...")
+def inject_all():
+    """Inject all three scenarios in one transaction so a failure rolls back cleanly."""
+    print("[INJECT] Schema drift, data quality issue, and SLA breach...")
+
+    execute_write_fast(SCHEMA_DRIFT_SQL + DATA_QUALITY_SQL + SLA_BREACH_SQL)
+
+    print("   Done. raw.orders now has 'discount_amount' column.")
+    print("   Done. stg_orders and mart_revenue_daily marked as FAILED.")
+    print("   Done. 75 orders now have NULL total_amount (15% null rate, threshold is 5%).")
+    print("   Done. mart_customer_orders has been 'running' for 65 min (SLA: 20 min).")
+
+
+def _run_concurrently(statements: list[str]):
+    """Run independent write statements in parallel and wait for all of them."""
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        # list() re-raises the first failure from any worker
+        list(executor.map(execute_write_fast, statements))
+
 
-    # Remove added column
-    execute_write("ALTER TABLE raw.orders DROP COLUMN IF EXISTS discount_amount CASCADE;")
+def reset_demo(wait_dbt: bool = False):
+    """Reset all injected failures back to clean state.
 
-    # Restore null amounts
-    execute_write("""
+    Args:
+        wait_dbt: Block until the dbt rebuild finishes instead of running it in the background.
+    """
+    print("[RESET] Resetting demo state...")
+
+    # Dropping the injected column CASCADEs to the dbt views built on it; when
+    # it was never added there is nothing to drop and nothing to rebuild.
+    drift_injected = bool(execute_query("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'raw' AND table_name = 'orders' AND column_name = 'discount_amount';
+    """))
+
+    # Statements in a group touch different tables and run concurrently on
+    # separate pooled connections; each group waits for the previous one.
+    # Group 1: drop the injected column and clear the tables that reference
+    # pipeline_runs, so the run cleanup in group 2 cannot hit their FKs.
+    # TRUNCATE without CASCADE: nothing references quality_results,
+    # agent_actions or schema_snapshots (see data/sql/init.sql).
+    # reseed_quality_results() truncates quality_results and seeds passing
+    # results (run_id NULL) so "check" shows all green.
+    group_1 = [
+        "SELECT pipeline_meta.reseed_quality_results();",
+        "TRUNCATE pipeline_meta.agent_actions RESTART IDENTITY;",
+        "TRUNCATE pipeline_meta.schema_snapshots RESTART IDENTITY;",
+        "TRUNCATE pipeline_meta.fix_cache;",
+    ]
+    if drift_injected:
+        group_1.append("ALTER TABLE raw.orders DROP COLUMN IF EXISTS discount_amount CASCADE;")
+    _run_concurrently(group_1)
+
+    # Group 2: restore data and re-snapshot the cleaned-up schema.
+    _run_concurrently([
+        # Restore null amounts
+        """
         UPDATE raw.orders SET total_amount = (random() * 500 + 20)::decimal(10,2)
         WHERE total_amount IS NULL;
-    """)
-
-    # Remove failed/running runs from last hour
-    execute_write("""
+        """,
+        # Remove failed/running runs from last hour
+        """
         DELETE FROM pipeline_meta.pipeline_runs
         WHERE started_at > NOW() - INTERVAL '2 hours'
         AND status IN ('failed', 'running');
-    """)
-
-    # Clear all quality results and seed passing ones
-    execute_write("DELETE FROM pipeline_meta.quality_results;")
-    
-    # Seed passing quality check results so "check" shows all green
-    # Actual values must be BELOW thresholds for max checks, ABOVE for min checks
-    execute_write("""
-        INSERT INTO pipeline_meta.quality_results (check_id, status, actual_value, expected_value, checked_at, details)
-        SELECT 
-            check_id,
-            'pass',
-            CASE 
-                WHEN threshold_type = 'max_percent' THEN GREATEST(0, threshold_value - 1.0)
-                WHEN threshold_type = 'min_count' THEN threshold_value + 100
-                WHEN threshold_type = 'max_age_hours' THEN GREATEST(0.5, threshold_value - 2.0)
-                WHEN threshold_type = 'max_count' THEN GREATEST(0, threshold_value - 1)
-                ELSE 0
-            END,
-            threshold_value,
-            NOW() - INTERVAL '30 minutes',
-            '{"status": "healthy"}'::jsonb
-        FROM pipeline_meta.data_quality_checks
-        WHERE is_active = true;
-    """)
-
-    # Clear agent actions
-    execute_write("DELETE FROM pipeline_meta.agent_actions;")
-
-    # Re-snapshot schema
-    execute_write("DELETE FROM pipeline_meta.schema_snapshots;")
-    execute_write("""
+        """,
+        # Re-snapshot schema. Kept server-side: a COPY would first pull the
+        # rows into Python for no gain.
+        """
         INSERT INTO pipeline_meta.schema_snapshots (table_name, column_name, data_type, is_nullable, ordinal_position)
         SELECT
             table_schema || '.' || table_name,
@@ -188,28 +210,39 @@ def reset_demo():
         FROM information_schema.columns
         WHERE table_schema IN ('raw', 'staging', 'marts')
         ORDER BY table_schema, table_name, ordinal_position;
-    """)
+        """,
+    ])
 
-    # Restore dbt model from backup if it exists
+    # Restore dbt model from backup if it exists. os.replace is a single atomic
+    # rename, so the file contents never pass through Python.
     import glob
-    for backup in glob.glob(os.path.join(os.path.dirname(os.path.dirname(__file__)), "dbt_project", "models", "**", "*.sql.backup"), recursive=True):
-        original = backup.replace(".backup", "")
-        with open(backup, "r") as f:
-            content = f.read()
-        with open(original, "w") as f:
-            f.write(content)
-        os.remove(backup)
+    backups = glob.glob(os.path.join(os.path.dirname(os.path.dirname(__file__)), "dbt_project", "models", "**", "*.sql.backup"), recursive=True)
+    for backup in backups:
+        original = backup[:-len(".backup")]
+        os.replace(backup, original)
         print(f"   Restored {os.path.basename(original)} from backup.")
 
-    # Re-run dbt to recreate views that may have been dropped by CASCADE
+    # Re-run dbt to recreate views dropped by CASCADE or built from a restored
+    # model. The database is already reset, so by default the rebuild runs in
+    # the background and control returns immediately.
     import subprocess
     dbt_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "dbt_project")
-    subprocess.run(
-        ["dbt", "run", "--profiles-dir", "."],
-        cwd=dbt_dir, capture_output=True, text=True,
-        env={**os.environ},
-    )
-    print("   dbt models rebuilt.")
+    if not drift_injected and not backups:
+        print("   No views dropped or models restored; skipping dbt rebuild.")
+    elif wait_dbt:
+        subprocess.run(
+            ["dbt", "run", "--profiles-dir", "."],
+            cwd=dbt_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env={**os.environ}, check=False,
+        )
+        print("   dbt models rebuilt.")
+    else:
+        proc = subprocess.Popen(
+            ["dbt", "run", "--profiles-dir", "."],
+            cwd=dbt_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env={**os.environ},
+        )
+        print(f"   dbt rebuild started in background (pid={proc.pid}).")
 
     print("   Done. Demo state reset to clean.")
 
@@ -222,6 +255,11 @@ if __name__ == "__main__":
         required=True,
         help="Which failure scenario to inject",
     )
+    parser.add_argument(
+        "--wait-dbt",
+        action="store_true",
+        help="With --scenario reset, wait for the dbt rebuild to finish (e.g. in CI)",
+    )
     args = parser.parse_args()
 
     if args.scenario == "schema_drift":
@@ -231,11 +269,9 @@ if __name__ == "__main__":
     elif args.scenario == "sla_breach":
         inject_sla_breach()
     elif args.scenario == "all":
-        inject_schema_drift()
-        inject_data_quality_issue()
-        inject_sla_breach()
+        inject_all()
     elif args.scenario == "reset":
-        reset_demo()
+        reset_demo(wait_dbt=args.wait_dbt)
 
     print("\nDone! Run the orchestrator to see the agents respond:")
     print("  python -m src.agents.orchestrator")
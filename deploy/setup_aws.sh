@@ -101,6 +101,7 @@ echo "  RDS endpoint: $RDS_ENDPOINT"
 echo ""
 echo "[4/5] Initializing database with schema and seed data..."
 PGPASSWORD=$DB_PASSWORD psql -h $RDS_ENDPOINT -U $DB_USER -d $DB_NAME -f data/sql/init.sql
+PGPASSWORD=$DB_PASSWORD psql -h $RDS_ENDPOINT -U $DB_USER -d $DB_NAME -f data/sql/migrations.sql
 echo "  Database initialized."
 
 # --- Step 5: Launch EC2 Instance ---
@@ -5,9 +5,11 @@ Uses Nova 2 Lite's extended thinking for deep reasoning about
 pipeline failures, tracing issues through the dependency graph.
 """
 
+import re
+from typing import Optional
+
 from strands import Agent
-from strands.models import BedrockModel
-from src.config.settings import settings
+from src.config.llm import get_bedrock_model, invoke_agent, prompt_payload, thread_local_agent
 from src.mcp_server.tools import (
     get_pipeline_status,
     get_pipeline_dag,
@@ -57,52 +59,35 @@ Log your diagnosis using log_agent_action with agent_name='diagnostics'.
 """
 
 
+# Built once at import so every agent gets the same tool definitions in the
+# same order, keeping the tool section of the Bedrock request byte-identical.
+DIAGNOSTICS_TOOLS = [
+    get_pipeline_status,
+    get_pipeline_dag,
+    get_run_history,
+    get_schema_info,
+    get_quality_checks,
+    execute_diagnostic_sql,
+    log_agent_action,
+    list_dbt_models,
+    get_dbt_model_sql,
+    get_agent_action_history,
+    get_failure_patterns,
+]
+
+
 def create_diagnostics_agent() -> Agent:
     """Create and return the Diagnostics Agent with extended thinking."""
-    model = BedrockModel(
-        model_id=settings.NOVA_MODEL_ID,
-        region_name=settings.AWS_REGION,
-        additional_request_fields={
-            "reasoningConfig": {
-                "type": "enabled",
-                "maxReasoningEffort": "high",
-            }
-        },
-    )
-
     return Agent(
-        model=model,
+        model=get_bedrock_model("high"),
         system_prompt=DIAGNOSTICS_SYSTEM_PROMPT,
-        tools=[
-            get_pipeline_status,
-            get_pipeline_dag,
-            get_run_history,
-            get_schema_info,
-            get_quality_checks,
-            execute_diagnostic_sql,
-            log_agent_action,
-            list_dbt_models,
-            get_dbt_model_sql,
-            get_agent_action_history,
-            get_failure_patterns,
-        ],
+        tools=DIAGNOSTICS_TOOLS,
     )
 
 
-def diagnose_alert(alert: dict) -> str:
-    """Given an alert from the Monitor Agent, perform root cause analysis.
+_get_diagnostics_agent = thread_local_agent(create_diagnostics_agent)
 
-    Args:
-        alert: Dict with keys like pipeline_name, alert_type, severity, description
-    """
-    agent = create_diagnostics_agent()
-
-    prompt = f"""Diagnose the following pipeline alert:
-
-Pipeline: {alert.get('pipeline_name', 'unknown')}
-Alert Type: {alert.get('alert_type', 'unknown')}
-Severity: {alert.get('severity', 'unknown')}
-Description: {alert.get('description', 'No description provided')}
+DIAGNOSE_ALERT_INSTRUCTIONS = """Diagnose the pipeline alert given as JSON at the end of this message.
 
 Perform a thorough root cause analysis:
 1. Get the dependency graph for this pipeline to understand upstream/downstream.
@@ -111,12 +96,70 @@ Perform a thorough root cause analysis:
 4. Run diagnostic SQL queries to verify your hypotheses.
 5. Provide your diagnosis with evidence and a recommended fix.
 
-Think step by step. Log your diagnosis using log_agent_action."""
+Think step by step. Log your diagnosis using log_agent_action.
+End your answer with a line of the form "Confidence: <0.0-1.0>".
+
+Alert:
+"""
+
+
+def diagnose_alert(alert: dict) -> str:
+    """Given an alert from the Monitor Agent, perform root cause analysis.
+
+    Args:
+        alert: Dict with keys like pipeline_name, alert_type, severity, description
+    """
+    agent = _get_diagnostics_agent()
+
+    # Static instructions first, alert last, so only the tail varies per call
+    payload = {
+        "pipeline_name": alert.get("pipeline_name", "unknown"),
+        "alert_type": alert.get("alert_type", "unknown"),
+        "severity": alert.get("severity", "unknown"),
+        "description": alert.get("description", "No description provided"),
+    }
+    prompt = DIAGNOSE_ALERT_INSTRUCTIONS + prompt_payload(payload)
 
-    response = agent(prompt)
+    response = invoke_agent(agent, prompt)
     return str(response)
 
 
+# The line the prompt asks the diagnosis to end with: "Confidence: 0.8",
+# "**Overall confidence**: 80% (high)", "- confidence score = 8/10"
+_CONFIDENCE_RE = re.compile(
+    r"\bconfidence(?:\s+(?:level|score))?[\s*_]*(?:\([^)\n]*\)[\s*_]*)?[:=][\s*_]*"
+    r"(\d+(?:\.\d+)?)\s*(?:(%)|/\s*(\d+(?:\.\d+)?))?",
+    re.IGNORECASE,
+)
+# Models often close with a sentence, a code fence or a sign-off after the
+# confidence line, so look at a few trailing lines rather than only the last
+CONFIDENCE_TAIL_LINES = 5
+
+
+def parse_confidence(diagnosis: str) -> Optional[float]:
+    """Extract the 0.0-1.0 confidence reported at the end of a diagnosis.
+
+    Only the last CONFIDENCE_TAIL_LINES non-empty lines are searched and the
+    last match wins, so a confidence quoted earlier in the text (evidence, a
+    previous diagnosis) is not picked up. "N/D" is scaled by D and "N%" or a
+    bare N above 1 by 100. Returns None if no confidence can be read.
+    """
+    lines = [line for line in str(diagnosis).splitlines() if line.strip()]
+    matches = list(_CONFIDENCE_RE.finditer("\n".join(lines[-CONFIDENCE_TAIL_LINES:])))
+    if not matches:
+        return None
+    match = matches[-1]
+    value = float(match.group(1))
+    if match.group(3) is not None:
+        denominator = float(match.group(3))
+        if denominator == 0:
+            return None
+        value /= denominator
+    elif match.group(2) or value > 1:
+        value /= 100
+    return min(value, 1.0)
+
+
 if __name__ == "__main__":
     # Example: diagnose a test alert
     test_alert = {
@@ -9,8 +9,7 @@ Responsibilities:
 """
 
 from strands import Agent
-from strands.models import BedrockModel
-from src.config.settings import settings
+from src.config.llm import get_bedrock_model, invoke_agent, thread_local_agent
 from src.mcp_server.tools import (
     get_pipeline_status,
     get_schema_info,
@@ -47,32 +46,52 @@ Do NOT attempt to fix anything - that's the Repair Agent's job.
 """
 
 
+# Built once at import so every agent gets the same tool definitions in the
+# same order, keeping the tool section of the Bedrock request byte-identical.
+MONITOR_TOOLS = [
+    get_pipeline_status,
+    get_schema_info,
+    get_quality_checks,
+    get_run_history,
+    execute_diagnostic_sql,
+    log_agent_action,
+    get_monitored_tables,
+    get_pipelines_with_quality_checks,
+]
+
+
 def create_monitor_agent() -> Agent:
     """Create and return the Monitor Agent."""
-    model = BedrockModel(
-        model_id=settings.NOVA_MODEL_ID,
-        region_name=settings.AWS_REGION,
-    )
-
     return Agent(
-        model=model,
+        model=get_bedrock_model(),
         system_prompt=MONITOR_SYSTEM_PROMPT,
-        tools=[
-            get_pipeline_status,
-            get_schema_info,
-            get_quality_checks,
-            get_run_history,
-            execute_diagnostic_sql,
-            log_agent_action,
-            get_monitored_tables,
-            get_pipelines_with_quality_checks,
-        ],
+        tools=MONITOR_TOOLS,
     )
 
 
+_get_monitor_agent = thread_local_agent(create_monitor_agent)
+
+
+def _count_logged_alerts(messages: list) -> int:
+    """Count the log_agent_action(action_type='alert') calls the agent made in this conversation."""
+    count = 0
+    for message in messages:
+        for block in message.get("content", []):
+            tool_use = block.get("toolUse")
+            if tool_use and tool_use.get("name") == "log_agent_action" \
+                    and tool_use.get("input", {}).get("action_type") == "alert":
+                count += 1
+    return count
+
+
 def run_health_check() -> str:
     """Run a full pipeline health check and return findings."""
-    agent = create_monitor_agent()
+    return run_health_check_with_alerts()[0]
+
+
+def run_health_check_with_alerts() -> tuple[str, int]:
+    """Run a full pipeline health check and return (findings, number of alerts logged)."""
+    agent = _get_monitor_agent()
 
     prompt = """Perform a comprehensive pipeline health check:
 
@@ -85,8 +104,8 @@ def run_health_check() -> str:
 If everything is healthy including quality checks, say so.
 Log each finding using log_agent_action with agent_name='monitor'."""
 
-    response = agent(prompt)
-    return str(response)
+    response = invoke_agent(agent, prompt)
+    return str(response), _count_logged_alerts(agent.messages)
 
 
 if __name__ == "__main__":
@@ -6,15 +6,20 @@ It decides when to escalate vs auto-handle, and maintains
 the overall workflow state.
 """
 
-import json
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+
 from strands import Agent
-from strands.models import BedrockModel
-from src.config.settings import settings
-from src.agents.monitor import create_monitor_agent, run_health_check
-from src.agents.diagnostics import create_diagnostics_agent, diagnose_alert
-from src.agents.repair import create_repair_agent, propose_fix
-from src.agents.verification import create_verification_agent, verify_fix
-from src.mcp_server.tools import get_pipeline_status, log_agent_action
+from src.config.db import execute_query
+from src.config.llm import get_bedrock_model
+from src.agents.monitor import run_health_check
+from src.agents.diagnostics import diagnose_alert, parse_confidence
+from src.agents.repair import propose_fix
+from src.mcp_server.tools import ALL_TOOLS, clear_shared_state
+
+logger = logging.getLogger(__name__)
 
 
 ORCHESTRATOR_SYSTEM_PROMPT = """You are the Orchestrator for Agentic Pipeline Repair. You coordinate the full
@@ -53,14 +58,91 @@ Always be transparent about confidence levels and ask for approval before applyi
 """
 
 
+@lru_cache(maxsize=1)
+def _get_orchestrator_agent() -> Agent:
+    """Build the interactive orchestrator agent once and reuse it across sessions."""
+    return Agent(
+        model=get_bedrock_model("medium", cache_prompt=True),
+        system_prompt=ORCHESTRATOR_SYSTEM_PROMPT,
+        tools=ALL_TOOLS,
+    )
+
+
+# Nova reasoning effort per alert severity; extended thinking dominates
+# latency, so only CRITICAL alerts get the highest setting.
+SEVERITY_EFFORT = {
+    "CRITICAL": "high",
+    "WARNING": "medium",
+    "INFO": "low",
+}
+
+# Non-CRITICAL alerts only get a fix proposal when the diagnosis is at least this confident
+MIN_FIX_CONFIDENCE = 0.7
+
+# Upper bound on concurrent Bedrock calls per wave in handle_alert_batch
+BATCH_WORKERS = 8
+
+# Upper bound on alert clusters handled at once by handle_alerts
+MAX_CONCURRENT_CLUSTERS = 4
+
+
+def _cluster_by_dag(alerts: list[dict]) -> list[list[dict]]:
+    """Group alerts whose pipelines are connected in the dependency graph.
+
+    Alerts in different groups touch disjoint parts of the DAG and can be
+    handled independently. Groups and the alerts within them keep input order.
+    """
+    edges = execute_query("""
+        SELECT p.pipeline_name, u.pipeline_name AS depends_on
+        FROM pipeline_meta.dependencies d
+        JOIN pipeline_meta.pipelines p ON p.pipeline_id = d.pipeline_id
+        JOIN pipeline_meta.pipelines u ON u.pipeline_id = d.depends_on_pipeline_id;
+    """)
+
+    parent = {}
+
+    def find(name):
+        parent.setdefault(name, name)
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for edge in edges:
+        parent[find(edge["pipeline_name"])] = find(edge["depends_on"])
+
+    clusters = {}
+    for alert in alerts:
+        clusters.setdefault(find(alert.get("pipeline_name")), []).append(alert)
+    return list(clusters.values())
+
+
 class PipelineOrchestrator:
-    """Main orchestrator that runs the agent pipeline."""
+    """Main orchestrator that runs the agent pipeline.
+
+    Sub-agents are built on first access so that paths which never use them
+    (such as interactive_session) do not pay for their Bedrock clients.
+    """
+
+    @cached_property
+    def monitor(self) -> Agent:
+        from src.agents.monitor import create_monitor_agent
+        return create_monitor_agent()
 
-    def __init__(self):
-        self.monitor = create_monitor_agent()
-        self.diagnostics = create_diagnostics_agent()
-        self.repair = create_repair_agent()
-        self.verification = create_verification_agent()
+    @cached_property
+    def diagnostics(self) -> Agent:
+        from src.agents.diagnostics import create_diagnostics_agent
+        return create_diagnostics_agent()
+
+    @cached_property
+    def repair(self) -> Agent:
+        from src.agents.repair import create_repair_agent
+        return create_repair_agent()
+
+    @cached_property
+    def verification(self) -> Agent:
+        from src.agents.verification import create_verification_agent
+        return create_verification_agent()
 
     def run_full_check(self) -> dict:
         """Run a complete health check -> diagnose -> repair cycle."""
@@ -72,56 +154,163 @@ class PipelineOrchestrator:
             "summary": "",
         }
 
-        print("[MONITOR] Running pipeline health check...")
+        logger.info("[MONITOR] Running pipeline health check...")
         health_result = run_health_check()
         results["health_check"] = health_result
-        print("   Health check complete.")
+        logger.info("[MONITOR] Health check complete.")
 
         return results
 
-    def handle_alert(self, alert: dict) -> dict:
-        """Handle a specific alert through the full pipeline."""
+    def handle_alert(self, alert: dict, clear_state: bool = True) -> dict:
+        """Handle a specific alert through the full pipeline.
+
+        Args:
+            alert: The alert to diagnose and repair.
+            clear_state: Start from fresh shared tool state. The shared state is
+                process-wide, so callers that run several incidents at once pass
+                False and clear it once for the whole batch instead.
+        """
         result = {"alert": alert, "diagnosis": None, "fix_proposal": None, "verification": None}
+        if clear_state:
+            # Start the incident from fresh dbt SQL and schemas, then share them across agents
+            clear_shared_state()
 
-        print(f"[DIAGNOSTICS] Diagnosing: {alert.get('pipeline_name', 'unknown')}...")
+        logger.info("[DIAGNOSTICS] Diagnosing: %s...", alert.get("pipeline_name", "unknown"))
         diagnosis = diagnose_alert(alert)
         result["diagnosis"] = diagnosis
-        print("   Diagnosis complete.")
+        logger.info("[DIAGNOSTICS] Diagnosis complete.")
 
-        print("[REPAIR] Generating fix proposal...")
-        fix = propose_fix(
+        if not self._should_propose_fix(alert, diagnosis):
+            return result
+
+        logger.info("[REPAIR] Generating fix proposal...")
+        result["fix_proposal"] = self._propose_fix_for(alert, diagnosis)
+        logger.info("[REPAIR] Fix proposal ready.")
+
+        return result
+
+    def _should_propose_fix(self, alert: dict, diagnosis: str) -> bool:
+        """Skip the Repair Agent for non-CRITICAL alerts with a low-confidence diagnosis.
+
+        A diagnosis whose confidence cannot be read is not treated as low
+        confidence: the fix is still proposed and a warning is logged.
+        """
+        if str(alert.get("severity", "")).upper() == "CRITICAL":
+            return True
+        confidence = parse_confidence(diagnosis)
+        if confidence is None:
+            logger.warning(
+                "[REPAIR] No confidence found in the diagnosis for %s; proposing a fix anyway",
+                alert.get("pipeline_name", "unknown"),
+            )
+            return True
+        if confidence < MIN_FIX_CONFIDENCE:
+            logger.info(
+                "[REPAIR] Skipping fix for %s: diagnosis confidence %.2f < %.1f",
+                alert.get("pipeline_name", "unknown"), confidence, MIN_FIX_CONFIDENCE,
+            )
+            return False
+        return True
+
+    def _propose_fix_for(self, alert: dict, diagnosis: str) -> str:
+        """Ask the Repair Agent for a fix, with reasoning effort set by the alert severity."""
+        effort = SEVERITY_EFFORT.get(str(alert.get("severity", "")).upper(), "medium")
+        return propose_fix(
             {
                 "root_cause": diagnosis,
                 "affected_pipelines": [alert.get("pipeline_name")],
+                "alert_type": alert.get("alert_type"),
                 "evidence": alert.get("description", ""),
                 "recommended_fix": "Determine from diagnosis",
-            }
+            },
+            effort=effort,
         )
-        result["fix_proposal"] = fix
-        print("   Fix proposal ready.")
 
-        return result
+    async def handle_alert_batch(self, alerts: list[dict]) -> list[dict]:
+        """Handle several alerts in two concurrent waves.
 
-    def interactive_session(self):
-        """Run an interactive session where users can ask questions about pipelines."""
-        model = BedrockModel(
-            model_id=settings.NOVA_MODEL_ID,
-            region_name=settings.AWS_REGION,
-            additional_request_fields={
-                "reasoningConfig": {
-                    "type": "enabled",
-                    "maxReasoningEffort": "medium",
-                }
-            },
-        )
+        All diagnoses are requested first, then fix proposals for the alerts
+        that were diagnosed, so each wave's Bedrock calls overlap on the
+        shared connection pool instead of running one alert at a time.
+        Diagnoses are read-only and all run at once; repairs on pipelines
+        connected in the DAG run one after another, as in handle_alerts, so
+        two Repair Agents never edit or run the same models together.
+        Results are returned in input order; an alert that raised gets an
+        "error" entry instead.
+        """
+        loop = asyncio.get_running_loop()
+        clear_shared_state()
+        results = [{"alert": alert, "diagnosis": None, "fix_proposal": None, "verification": None} for alert in alerts]
 
-        from src.mcp_server.tools import ALL_TOOLS
+        with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+            logger.info("[DIAGNOSTICS] Diagnosing %d alert(s)...", len(alerts))
+            diagnoses = await asyncio.gather(
+                *(loop.run_in_executor(pool, diagnose_alert, alert) for alert in alerts),
+                return_exceptions=True,
+            )
+            diagnosed = []
+            for result, diagnosis in zip(results, diagnoses):
+                if isinstance(diagnosis, Exception):
+                    result["error"] = str(diagnosis)
+                else:
+                    result["diagnosis"] = diagnosis
+                    if self._should_propose_fix(result["alert"], diagnosis):
+                        diagnosed.append(result)
 
-        agent = Agent(
-            model=model,
-            system_prompt=ORCHESTRATOR_SYSTEM_PROMPT,
-            tools=ALL_TOOLS,
-        )
+            def repair_cluster(cluster: list[dict]) -> None:
+                for result in cluster:
+                    try:
+                        result["fix_proposal"] = self._propose_fix_for(result["alert"], result["diagnosis"])
+                    except Exception as e:
+                        result["error"] = str(e)
+
+            if not diagnosed:
+                return results
+            by_alert = {id(r["alert"]): r for r in diagnosed}
+            clusters = await asyncio.to_thread(_cluster_by_dag, [r["alert"] for r in diagnosed])
+            logger.info("[REPAIR] Generating %d fix proposal(s) in %d cluster(s)...", len(diagnosed), len(clusters))
+            await asyncio.gather(*(
+                loop.run_in_executor(pool, repair_cluster, [by_alert[id(alert)] for alert in cluster])
+                for cluster in clusters
+            ))
+
+        return results
+
+    async def handle_alerts(self, alerts: list[dict]) -> list[dict]:
+        """Handle alerts in parallel across independent parts of the pipeline DAG.
+
+        Alerts on connected pipelines form one cluster and are handled one
+        after another, so two repairs never race on the same models; separate
+        clusters run concurrently, at most MAX_CONCURRENT_CLUSTERS at a time.
+        Results are returned in input order.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CLUSTERS)
+
+        def handle_cluster(cluster: list[dict]) -> list[dict]:
+            results = []
+            for alert in cluster:
+                try:
+                    results.append(self.handle_alert(alert, clear_state=False))
+                except Exception as e:
+                    results.append({"alert": alert, "error": str(e)})
+            return results
+
+        async def run(cluster: list[dict]) -> list[dict]:
+            async with semaphore:
+                return await asyncio.to_thread(handle_cluster, cluster)
+
+        # Once for the batch: clearing per alert would wipe the state other
+        # clusters' incidents are still using
+        clear_shared_state()
+        clusters = await asyncio.to_thread(_cluster_by_dag, alerts)
+        outcomes = await asyncio.gather(*(run(cluster) for cluster in clusters))
+
+        by_alert = {id(r["alert"]): r for results in outcomes for r in results}
+        return [by_alert[id(alert)] for alert in alerts]
+
+    def interactive_session(self):
+        """Run an interactive session where users can ask questions about pipelines."""
+        agent = _get_orchestrator_agent()
 
         print("\nAgentic Pipeline Repair")
         print("=" * 50)
@@ -151,5 +340,8 @@ class PipelineOrchestrator:
 
 
 if __name__ == "__main__":
+    from src.config.log import setup_logging
+
+    setup_logging()
     orchestrator = PipelineOrchestrator()
     orchestrator.interactive_session()
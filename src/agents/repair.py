@@ -3,12 +3,25 @@ Repair Agent: Generates and applies fix proposals for diagnosed pipeline issues.
 
 Can propose fixes, auto-apply them to dbt models (with approval),
 run dbt to verify, and rollback if needed.
+
+Fix proposals are cached in pipeline_meta.fix_cache, keyed by the affected
+pipelines, the alert type, the alert's error text with numbers and
+timestamps masked, and a hash of the affected dbt models' SQL, so a
+recurring incident is answered without another Bedrock call until one of
+those models changes. A pipeline's entries are evicted when its fix is
+rolled back or fails verification.
 """
 
+import hashlib
+import json
+import logging
+import re
+
 from strands import Agent
-from strands.models import BedrockModel
-from src.config.settings import settings
+from src.config.db import execute_query, execute_write
+from src.config.llm import get_bedrock_model, invoke_agent, prompt_payload, thread_local_agent
 from src.mcp_server.tools import (
+    _get_model_index,
     get_pipeline_dag,
     get_schema_info,
     execute_diagnostic_sql,
@@ -20,6 +33,8 @@ from src.mcp_server.tools import (
     rollback_dbt_model,
 )
 
+logger = logging.getLogger(__name__)
+
 REPAIR_SYSTEM_PROMPT = """You are the Repair Agent for Agentic Pipeline Repair. Given a diagnosis from the
 Diagnostics Agent, you generate concrete fix proposals and can auto-apply them.
 
@@ -57,46 +72,37 @@ Log each action using log_agent_action with agent_name='repair'.
 """
 
 
-def create_repair_agent() -> Agent:
-    """Create and return the Repair Agent."""
-    model = BedrockModel(
-        model_id=settings.NOVA_MODEL_ID,
-        region_name=settings.AWS_REGION,
-        additional_request_fields={
-            "reasoningConfig": {
-                "type": "enabled",
-                "maxReasoningEffort": "medium",
-            }
-        },
-    )
+# Built once at import so every agent gets the same tool definitions in the
+# same order, keeping the tool section of the Bedrock request byte-identical.
+REPAIR_TOOLS = [
+    get_pipeline_dag,
+    get_schema_info,
+    execute_diagnostic_sql,
+    log_agent_action,
+    list_dbt_models,
+    get_dbt_model_sql,
+    apply_dbt_model_fix,
+    run_dbt_model,
+    rollback_dbt_model,
+]
+
 
+def create_repair_agent(effort: str = "medium") -> Agent:
+    """Create and return the Repair Agent.
+
+    Args:
+        effort: Nova maxReasoningEffort ("low", "medium", "high").
+    """
     return Agent(
-        model=model,
+        model=get_bedrock_model(effort, cache_prompt=True),
         system_prompt=REPAIR_SYSTEM_PROMPT,
-        tools=[
-            get_pipeline_dag,
-            get_schema_info,
-            execute_diagnostic_sql,
-            log_agent_action,
-            list_dbt_models,
-            get_dbt_model_sql,
-            apply_dbt_model_fix,
-            run_dbt_model,
-            rollback_dbt_model,
-        ],
+        tools=REPAIR_TOOLS,
     )
 
 
-def propose_fix(diagnosis: dict) -> str:
-    """Given a diagnosis, generate a fix proposal."""
-    agent = create_repair_agent()
-
-    prompt = f"""Generate a fix proposal for the following diagnosed issue:
+_get_repair_agent = thread_local_agent(create_repair_agent)
 
-Root Cause: {diagnosis.get('root_cause', 'unknown')}
-Affected Pipelines: {diagnosis.get('affected_pipelines', [])}
-Evidence: {diagnosis.get('evidence', 'none')}
-Recommended Fix Direction: {diagnosis.get('recommended_fix', 'none')}
+PROPOSE_FIX_INSTRUCTIONS = """Generate a fix proposal for the diagnosed issue given as JSON at the end of this message.
 
 Steps:
 1. Read the current dbt model SQL for affected pipelines.
@@ -105,10 +111,130 @@ Steps:
 4. Assess risk and provide a rollback plan.
 5. Log the fix proposal using log_agent_action.
 
-Provide the complete fix in a clear format."""
+Provide the complete fix in a clear format.
+
+Diagnosis:
+"""
+
+# Proposals that modify or drop data are never served from the cache
+_HIGH_RISK_RE = re.compile(r"risk[^\n]{0,40}\bHIGH\b", re.IGNORECASE)
+
+
+def _normalize(text) -> str:
+    """Collapse case and whitespace so trivially different diagnoses share a key."""
+    return " ".join(str(text).lower().split())
+
+
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ t]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _error_signature(text) -> str:
+    """Normalize an alert's error text, masking timestamps and numbers that vary per run."""
+    text = _TIMESTAMP_RE.sub("<ts>", _normalize(text))
+    return _NUMBER_RE.sub("#", text)
+
+
+def _model_sql_digests(model_names: set) -> dict:
+    """Hash the current SQL of the given dbt models (pipelines without a model are skipped)."""
+    digests = {}
+    index = _get_model_index()
+    for name in model_names:
+        entry = index.get(name)
+        if entry is not None:
+            with open(entry[0], "rb") as fh:
+                digests[name] = hashlib.sha256(fh.read()).hexdigest()
+    return digests
+
+
+def _fix_cache_key(diagnosis: dict) -> str:
+    """Key a fix on what identifies a recurring incident, not the diagnosis prose.
+
+    The root cause is free-text LLM output that differs on every run, so it is
+    only used when the caller gives no alert_type to key on instead.
+    """
+    affected = sorted({str(p) for p in diagnosis.get("affected_pipelines", []) if p})
+    key = {
+        "affected_pipelines": affected,
+        "models": _model_sql_digests(set(affected)),
+        # Tells apart different incidents of one type, e.g. drift on another column
+        "error": _error_signature(diagnosis.get("error_message") or diagnosis.get("evidence", "")),
+    }
+    if diagnosis.get("alert_type"):
+        key["alert_type"] = _normalize(diagnosis["alert_type"])
+    else:
+        key["root_cause"] = _normalize(diagnosis.get("root_cause", ""))
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def _log_cached_fix(cache_key: str, diagnosis: dict) -> None:
+    """Record a cache hit as fix_proposed, as the Repair Agent would have logged it."""
+    for pipeline_name in diagnosis.get("affected_pipelines", []) or [None]:
+        log_agent_action(
+            agent_name="repair",
+            action_type="fix_proposed",
+            pipeline_name=pipeline_name,
+            summary="Fix proposal reused from fix_cache",
+            details=json.dumps({"cache_key": cache_key, "alert_type": diagnosis.get("alert_type")}),
+        )
+
+
+def _get_cached_fix(cache_key: str):
+    try:
+        rows = execute_query(
+            "SELECT fix_proposal FROM pipeline_meta.fix_cache WHERE cache_key = %s",
+            (cache_key,),
+        )
+    except Exception:
+        # A cache failure must never block a fix proposal
+        logger.warning("fix_cache lookup failed", exc_info=True)
+        return None
+    return rows[0]["fix_proposal"] if rows else None
+
+
+def _store_cached_fix(cache_key: str, diagnosis: dict, fix_proposal: str):
+    try:
+        execute_write("""
+            INSERT INTO pipeline_meta.fix_cache (cache_key, diagnosis, fix_proposal)
+            VALUES (%s, %s::jsonb, %s)
+            ON CONFLICT (cache_key) DO UPDATE
+            SET fix_proposal = EXCLUDED.fix_proposal, created_at = CURRENT_TIMESTAMP
+        """, (cache_key, json.dumps(diagnosis, default=str), fix_proposal))
+    except Exception:
+        logger.warning("fix_cache write failed", exc_info=True)
+
+
+def propose_fix(diagnosis: dict, effort: str = "medium") -> str:
+    """Given a diagnosis, generate a fix proposal (served from fix_cache when possible).
+
+    Args:
+        diagnosis: Dict with root_cause, affected_pipelines, evidence, recommended_fix
+            and optionally alert_type and error_message, which recurring incidents are
+            cached on (evidence stands in for error_message when it is absent).
+        effort: Nova reasoning effort for the Repair Agent ("low", "medium", "high").
+    """
+    cache_key = _fix_cache_key(diagnosis)
+    cached = _get_cached_fix(cache_key)
+    if cached is not None:
+        _log_cached_fix(cache_key, diagnosis)
+        return cached
+
+    agent = _get_repair_agent(effort)
+
+    # Static instructions first, diagnosis last, so only the tail varies per call
+    payload = {
+        "root_cause": diagnosis.get("root_cause", "unknown"),
+        "affected_pipelines": diagnosis.get("affected_pipelines", []),
+        "evidence": diagnosis.get("evidence", "none"),
+        "recommended_fix": diagnosis.get("recommended_fix", "none"),
+    }
+    prompt = PROPOSE_FIX_INSTRUCTIONS + prompt_payload(payload)
 
-    response = agent(prompt)
-    return str(response)
+    response = invoke_agent(agent, prompt)
+    fix_proposal = str(response)
+    if not _HIGH_RISK_RE.search(fix_proposal):
+        _store_cached_fix(cache_key, diagnosis, fix_proposal)
+    return fix_proposal
 
 
 if __name__ == "__main__":
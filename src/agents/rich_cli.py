@@ -3,15 +3,19 @@ Rich CLI for Agentic Pipeline Repair - Beautiful terminal interface for demos.
 
 Features:
 - Styled header and prompts
-- Real-time tool call display (from strands)
-- Markdown rendering for agent responses
+- Real-time tool call display
+- Markdown rendering for agent responses, streamed as tokens arrive
 - Color-coded panels
 
 Usage:
     python -m src.agents.rich_cli
 """
 
+import asyncio
+import time
+
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
 from rich.markdown import Markdown
 from rich.table import Table
@@ -84,27 +88,56 @@ def print_thinking():
     console.print()
 
 
+def response_panel(body) -> Panel:
+    """Wrap a renderable in the agent response panel."""
+    return Panel(
+        body,
+        title=f"[bold {COLORS['success']}]Agent Response[/bold {COLORS['success']}]",
+        border_style=COLORS['success'],
+        box=ROUNDED,
+        padding=(1, 2),
+    )
+
+
 def print_response(response: str):
     """Print the agent response with markdown formatting."""
     console.print()
     try:
-        md = Markdown(str(response))
-        console.print(Panel(
-            md,
-            title=f"[bold {COLORS['success']}]Agent Response[/bold {COLORS['success']}]",
-            border_style=COLORS['success'],
-            box=ROUNDED,
-            padding=(1, 2),
-        ))
-    except:
-        console.print(Panel(
-            str(response),
-            title=f"[bold {COLORS['success']}]Agent Response[/bold {COLORS['success']}]",
-            border_style=COLORS['success'],
-            box=ROUNDED,
-            padding=(1, 2),
-        ))
+        console.print(response_panel(Markdown(str(response))))
+    except Exception:
+        console.print(response_panel(str(response)))
+    console.print()
+
+
+# Seconds between Markdown re-parses while a response streams in
+MARKDOWN_RENDER_INTERVAL = 0.1
+
+
+async def stream_response(agent, prompt: str) -> str:
+    """Render the agent response into the response panel as tokens arrive."""
+    text = ""
+    tool_ids = set()
+    last_render = 0.0
+    console.print()
+    with Live(response_panel(Text("...", style="dim")), console=console,
+              refresh_per_second=20, vertical_overflow="visible") as live:
+        async for event in agent.stream_async(prompt):
+            tool_use = event.get("current_tool_use")
+            if tool_use and tool_use.get("toolUseId") not in tool_ids:
+                tool_ids.add(tool_use.get("toolUseId"))
+                console.print(f"[{COLORS['muted']}]Tool #{len(tool_ids)}: {tool_use.get('name')}[/{COLORS['muted']}]")
+            if "data" in event:
+                text += event["data"]
+                # Re-parsing the whole response per token gets slower as it grows,
+                # so parse at most every MARKDOWN_RENDER_INTERVAL and once more at the end
+                now = time.monotonic()
+                if now - last_render >= MARKDOWN_RENDER_INTERVAL:
+                    live.update(response_panel(Markdown(text)))
+                    last_render = now
+        if text:
+            live.update(response_panel(Markdown(text)))
     console.print()
+    return text
 
 
 def get_user_input() -> str:
@@ -120,9 +153,14 @@ def get_user_input() -> str:
 def run_rich_cli():
     """Run the rich CLI interface."""
     from strands import Agent
-    from strands.models import BedrockModel
-    from src.config.settings import settings
+    from src.config.llm import get_bedrock_model
     from src.mcp_server.tools import ALL_TOOLS
+    from src.agents.orchestrator import ORCHESTRATOR_SYSTEM_PROMPT
+    from rich.logging import RichHandler
+    from src.config.log import setup_logging
+    
+    # Log records from the agents render through the same Rich console
+    setup_logging(handler=RichHandler(console=console, show_path=False))
     
     # Clear screen and print header
     console.clear()
@@ -131,54 +169,14 @@ def run_rich_cli():
     
     # Initialize model
     with console.status(f"[bold {COLORS['cyan']}]Initializing Amazon Nova 2 Lite...[/bold {COLORS['cyan']}]", spinner="dots"):
-        model = BedrockModel(
-            model_id=settings.NOVA_MODEL_ID,
-            region_name=settings.AWS_REGION,
-            additional_request_fields={
-                "reasoningConfig": {
-                    "type": "enabled",
-                    "maxReasoningEffort": "medium",
-                }
-            },
-        )
-    
-    SYSTEM_PROMPT = """You are the Orchestrator for Agentic Pipeline Repair. You coordinate the full
-pipeline incident response workflow with 5 agents.
-
-IMPORTANT: Do not use emojis in your responses. Use plain text indicators like [PASS], [FAIL], [WARNING], [OK] instead.
-
-AGENTS:
-- Monitor Agent: Detects failures, SLA breaches, schema drift, quality issues
-- Diagnostics Agent: Root cause analysis with extended thinking
-- Repair Agent: Proposes and applies dbt model fixes
-- Verification Agent: Confirms fixes resolved the issue
-- You (Orchestrator): Coordinates the workflow
-
-WORKFLOW:
-1. MONITOR: Run health checks to detect issues
-2. TRIAGE: Assess severity and decide on response
-3. DIAGNOSE: For non-trivial issues, get root cause analysis
-4. REPAIR: Propose fixes, apply with approval, run dbt to compile
-5. VERIFY: Confirm the fix worked by checking pipeline status and quality
-
-You have access to all tools. Key capabilities:
-- apply_dbt_model_fix: Write fixes directly to dbt model files (ask for approval first)
-- run_dbt_model: Run dbt to compile and test after applying a fix
-- rollback_dbt_model: Revert if a fix doesn't work
-- get_failure_patterns: Identify recurring issues across pipelines
-
-DECISION RULES:
-- CRITICAL alerts: Full diagnosis + repair + auto-apply with approval + verify
-- WARNING alerts: Diagnosis + propose fix (don't auto-apply)
-- INFO alerts: Log and monitor
-
-Always be transparent about confidence levels and ask for approval before applying fixes.
-"""
+        model = get_bedrock_model("medium", cache_prompt=True)
     
+    # No callback handler: stream_response renders text and tool calls itself
     agent = Agent(
         model=model,
-        system_prompt=SYSTEM_PROMPT,
+        system_prompt=ORCHESTRATOR_SYSTEM_PROMPT,
         tools=ALL_TOOLS,
+        callback_handler=None,
     )
     
     console.print(f"[bold {COLORS['success']}]Ready[/bold {COLORS['success']}]")
@@ -222,8 +220,7 @@ Always be transparent about confidence levels and ask for approval before applyi
         print_thinking()
         
         try:
-            response = agent(user_input)
-            print_response(str(response))
+            asyncio.run(stream_response(agent, user_input))
         except KeyboardInterrupt:
             console.print(f"\n[{COLORS['warning']}]Interrupted[/{COLORS['warning']}]")
         except Exception as e:
@@ -5,15 +5,20 @@ Can run as a background thread alongside the FastAPI server,
 or as a standalone process.
 """
 
-import time
+import logging
 import threading
 import signal
 import sys
 from datetime import datetime
 
-from src.agents.monitor import create_monitor_agent, run_health_check
-from src.agents.verification import create_verification_agent
-from src.config.db import execute_query
+from src.agents.monitor import run_health_check_with_alerts
+from src.config.db import open_connection
+
+logger = logging.getLogger(__name__)
+
+# Postgres advisory lock key held by whichever process runs the schedule, so
+# several API workers (or a standalone scheduler) never check in parallel
+SCHEDULER_LOCK_KEY = 4242
 
 
 class PipelineScheduler:
@@ -22,7 +27,9 @@ class PipelineScheduler:
     def __init__(self, interval_minutes: int = 5):
         self.interval = interval_minutes * 60
         self.running = False
+        self._stop = threading.Event()
         self._thread = None
+        self._lock_conn = None
         self.last_check = None
         self.check_count = 0
 
@@ -30,57 +37,84 @@ class PipelineScheduler:
         """Execute a single health check cycle."""
         self.check_count += 1
         self.last_check = datetime.now()
-        print(f"[SCHEDULER] Health check #{self.check_count} at {self.last_check.strftime('%H:%M:%S')}")
+        logger.info("[SCHEDULER] Health check #%d at %s", self.check_count, self.last_check.strftime("%H:%M:%S"))
 
         try:
-            result = run_health_check()
-            print(f"[SCHEDULER] Check complete. Analyzing results...")
-
-            # Check if any critical issues were found by looking at recent agent actions
-            recent_alerts = execute_query("""
-                SELECT COUNT(*) as alert_count
-                FROM pipeline_meta.agent_actions
-                WHERE agent_name = 'monitor'
-                AND action_type = 'alert'
-                AND created_at > NOW() - INTERVAL '10 minutes'
-            """)
-
-            alert_count = recent_alerts[0]["alert_count"] if recent_alerts else 0
+            # The monitor reports how many alerts it logged, so no follow-up query is needed
+            result, alert_count = run_health_check_with_alerts()
+            logger.info("[SCHEDULER] Check complete. Analyzing results...")
+
             if alert_count > 0:
-                print(f"[SCHEDULER] {alert_count} new alert(s) detected!")
+                logger.warning("[SCHEDULER] %d new alert(s) detected!", alert_count)
             else:
-                print(f"[SCHEDULER] All pipelines healthy.")
+                logger.info("[SCHEDULER] All pipelines healthy.")
 
         except Exception as e:
-            print(f"[SCHEDULER] Error during health check: {e}")
+            logger.exception("[SCHEDULER] Error during health check: %s", e)
+
+    def _acquire_lock(self) -> bool:
+        """Take the cluster-wide scheduler lock; False if another process holds it."""
+        conn = open_connection()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (SCHEDULER_LOCK_KEY,))
+            acquired = cur.fetchone()[0]
+        if not acquired:
+            conn.close()
+            return False
+        # The lock lives as long as this session, so keep the connection open
+        self._lock_conn = conn
+        return True
+
+    def _release_lock(self, conn):
+        """Close the lock session, which releases the advisory lock with it."""
+        conn.close()
+        if self._lock_conn is conn:
+            self._lock_conn = None
 
     def _loop(self):
-        """Main scheduler loop."""
-        while self.running:
-            self._run_check()
-            # Sleep in small increments to allow clean shutdown
-            for _ in range(self.interval):
-                if not self.running:
-                    break
-                time.sleep(1)
-
-    def start(self):
-        """Start the scheduler in a background thread."""
+        """Main scheduler loop; releases the scheduler lock when it exits."""
+        lock_conn = self._lock_conn
+        try:
+            while not self._stop.is_set():
+                self._run_check()
+                # Blocks without polling and returns as soon as stop() is called
+                self._stop.wait(timeout=self.interval)
+        finally:
+            # Released here rather than in stop(), so another worker can only take
+            # over the schedule once an in-flight health check has finished
+            if lock_conn is not None:
+                self._release_lock(lock_conn)
+
+    def start(self) -> bool:
+        """Start the scheduler in a background thread.
+
+        Returns False without starting if another process already runs the schedule.
+        """
         if self.running:
-            print("[SCHEDULER] Already running.")
-            return
+            logger.info("[SCHEDULER] Already running.")
+            return True
+        if not self._acquire_lock():
+            logger.info("[SCHEDULER] Already running in another process.")
+            return False
 
         self.running = True
+        self._stop.clear()
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
-        print(f"[SCHEDULER] Started. Running health checks every {self.interval // 60} minutes.")
+        logger.info("[SCHEDULER] Started. Running health checks every %d minutes.", self.interval // 60)
+        return True
 
     def stop(self):
         """Stop the scheduler."""
         self.running = False
+        self._stop.set()
         if self._thread:
             self._thread.join(timeout=5)
-        print("[SCHEDULER] Stopped.")
+            if self._thread.is_alive():
+                logger.info("[SCHEDULER] Stopping after the current health check finishes.")
+                return
+        logger.info("[SCHEDULER] Stopped.")
 
     def status(self) -> dict:
         """Get scheduler status."""
@@ -106,6 +140,10 @@ if __name__ == "__main__":
     )
     args = parser.parse_args()
 
+    from src.config.log import setup_logging
+
+    setup_logging()
+
     sched = PipelineScheduler(interval_minutes=args.interval)
 
     def signal_handler(sig, frame):
@@ -118,5 +156,8 @@ if __name__ == "__main__":
     print(f"Starting scheduled monitoring (every {args.interval} minutes)")
     print("Press Ctrl+C to stop.\n")
 
+    if not sched._acquire_lock():
+        print("Scheduler is already running in another process.")
+        sys.exit(1)
     sched.running = True
     sched._loop()  # Run in main thread when standalone
@@ -6,9 +6,11 @@ the Verification Agent runs quality checks, compares before/after
 metrics, and confirms the pipeline is healthy.
 """
 
+import re
+from typing import Optional
+
 from strands import Agent
-from strands.models import BedrockModel
-from src.config.settings import settings
+from src.config.llm import get_bedrock_model, invoke_agent, prompt_payload, thread_local_agent
 from src.mcp_server.tools import (
     get_pipeline_status,
     get_run_history,
@@ -17,6 +19,7 @@ from src.mcp_server.tools import (
     execute_diagnostic_sql,
     log_agent_action,
     run_dbt_model,
+    evict_cached_fixes,
 )
 
 VERIFICATION_SYSTEM_PROMPT = """You are the Verification Agent for Agentic Pipeline Repair. After the Repair Agent
@@ -46,52 +49,73 @@ and action_type='fix_verified' or 'fix_verification_failed'.
 """
 
 
-def create_verification_agent() -> Agent:
-    """Create and return the Verification Agent."""
-    model = BedrockModel(
-        model_id=settings.NOVA_MODEL_ID,
-        region_name=settings.AWS_REGION,
-    )
-
-    return Agent(
-        model=model,
-        system_prompt=VERIFICATION_SYSTEM_PROMPT,
-        tools=[
-            get_pipeline_status,
-            get_run_history,
-            get_schema_info,
-            get_quality_checks,
-            execute_diagnostic_sql,
-            log_agent_action,
-            run_dbt_model,
-        ],
-    )
+# Built once at import so every agent gets the same tool definitions in the
+# same order, keeping the tool section of the Bedrock request byte-identical.
+VERIFICATION_TOOLS = [
+    get_pipeline_status,
+    get_run_history,
+    get_schema_info,
+    get_quality_checks,
+    execute_diagnostic_sql,
+    log_agent_action,
+    run_dbt_model,
+]
 
 
-def verify_fix(pipeline_name: str, fix_description: str) -> str:
-    """Verify that a fix applied to a pipeline actually resolved the issue.
+def create_verification_agent(effort: Optional[str] = None) -> Agent:
+    """Create and return the Verification Agent.
 
     Args:
-        pipeline_name: Name of the pipeline that was fixed.
-        fix_description: Description of what fix was applied.
+        effort: Nova maxReasoningEffort ("low", "medium", "high"), or None for no extended thinking.
     """
-    agent = create_verification_agent()
+    return Agent(
+        model=get_bedrock_model(effort, cache_prompt=True),
+        system_prompt=VERIFICATION_SYSTEM_PROMPT,
+        tools=VERIFICATION_TOOLS,
+    )
+
 
-    prompt = f"""Verify that the following fix was successful:
+_get_verification_agent = thread_local_agent(create_verification_agent)
 
-Pipeline: {pipeline_name}
-Fix Applied: {fix_description}
+VERIFY_FIX_INSTRUCTIONS = """Verify that the fix given as JSON at the end of this message was successful.
 
 Verification steps:
-1. Check the current pipeline status for {pipeline_name} and its downstream dependencies.
+1. Check the current pipeline status for the pipeline and its downstream dependencies.
 2. Run diagnostic SQL queries to verify the specific fix (e.g., check if the column exists, null rates are acceptable).
 3. Check data quality results for the pipeline.
 4. Report whether the fix is verified or not.
 
-Log your verification result using log_agent_action."""
+Log your verification result using log_agent_action.
+
+Fix:
+"""
+
+# The report's "verified: false" line, or the failure action it was told to log
+_VERIFY_FAILED_RE = re.compile(
+    r"\bverified\**\s*[:=]\s*\**\s*(?:false|no)\b|\bfix_verification_failed\b", re.IGNORECASE
+)
 
-    response = agent(prompt)
-    return str(response)
+
+def verify_fix(pipeline_name: str, fix_description: str, effort: Optional[str] = None) -> str:
+    """Verify that a fix applied to a pipeline actually resolved the issue.
+
+    Args:
+        pipeline_name: Name of the pipeline that was fixed.
+        fix_description: Description of what fix was applied.
+        effort: Nova reasoning effort for the Verification Agent, or None for no extended thinking.
+    """
+    agent = _get_verification_agent(effort)
+
+    # Static instructions first, fix details last, so only the tail varies per call
+    payload = {"fix_applied": fix_description, "pipeline": pipeline_name}
+    prompt = VERIFY_FIX_INSTRUCTIONS + prompt_payload(payload)
+
+    response = invoke_agent(agent, prompt)
+    result = str(response)
+    if _VERIFY_FAILED_RE.search(result):
+        # Never serve the proposal that led here to the next occurrence
+        evict_cached_fixes(pipeline_name)
+    return result
 
 
 if __name__ == "__main__":
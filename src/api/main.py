@@ -9,35 +9,87 @@ Endpoints:
 - POST /diagnose           - Diagnose a specific alert
 - POST /repair             - Get fix proposal for a diagnosis
 - POST /chat               - Interactive chat with orchestrator
+- GET  /chat/stream        - Chat reply streamed as Server-Sent Events
+- POST /chat/reset         - Clear the chat conversation
 - GET  /actions            - Recent agent actions log
+- POST /verify             - Verify an applied fix
+- POST /scheduler/start    - Start scheduled health checks (also /stop, /status)
+- GET  /patterns           - Historical failure patterns
+- GET  /                   - Dashboard
 """
 
-import os
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from functools import wraps
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import Optional
-import json
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from strands import Agent
 
 from src.config.settings import settings
-from src.config.db import execute_query
-from src.agents.orchestrator import PipelineOrchestrator
+from src.config.db import close_pool, execute_prepared, execute_query, execute_write, init_pool
+from src.config.llm import get_bedrock_model, warm_up
+from src.config.log import setup_logging
 from src.agents.monitor import run_health_check
 from src.agents.diagnostics import diagnose_alert
 from src.agents.repair import propose_fix
 from src.agents.verification import verify_fix
 from src.agents.scheduler import scheduler
+from src.mcp_server.tools import ALL_TOOLS, failure_pattern_rows, flush_agent_actions
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect and build the chat agent before the first request instead of inside it
+    init_pool()
+    try:
+        await asyncio.to_thread(warm_up)
+        await asyncio.to_thread(_get_chat_agent)
+    except Exception as e:
+        logger.warning("Chat agent warm-up failed; it will be built on first use: %s", e)
+    yield
+    close_pool()
+
 
 app = FastAPI(
     title="Agentic Pipeline Repair API",
     description="Multi-agent data pipeline repair system powered by Amazon Nova 2 Lite",
     version="0.1.0",
+    lifespan=lifespan,
+    # orjson serializes the list endpoints' rows several times faster than stdlib json
+    default_response_class=ORJSONResponse,
 )
 
+class StreamAwareGZipMiddleware:
+    """GZip responses of 1 KB or more, except the SSE chat stream.
+
+    Compressing the stream would buffer tokens until a gzip block fills.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/chat/stream":
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+app.add_middleware(StreamAwareGZipMiddleware, minimum_size=1024)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -46,12 +98,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-orchestrator = PipelineOrchestrator()
-
 
 # ---- Request/Response Models ----
+# Frozen: handlers only read these once validated, so they cannot be modified in place.
 
 class AlertRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     pipeline_name: str
     alert_type: str = "pipeline_failure"
     severity: str = "CRITICAL"
@@ -59,6 +112,8 @@ class AlertRequest(BaseModel):
 
 
 class DiagnosisRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     root_cause: str
     affected_pipelines: list[str]
     evidence: str = ""
@@ -66,13 +121,92 @@ class DiagnosisRequest(BaseModel):
 
 
 class ChatRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     message: str
 
 
 class ChatResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     response: str
 
 
+class VerifyRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    pipeline_name: str
+    fix_description: str
+
+
+# ---- Response cache ----
+
+# The dashboard polls the read endpoints every few seconds; within this window all
+# pollers share one query. Writes bump the generation so stale entries are skipped.
+CACHE_TTL_SECONDS = 5
+CACHE_MAX_KEYS = 256
+_cache_generation = 0
+_response_cache: dict[tuple, tuple[int, float, dict]] = {}
+_cache_locks: dict[tuple, asyncio.Lock] = {}
+
+
+def async_ttl_cache(ttl: float = CACHE_TTL_SECONDS):
+    """Cache an async endpoint's response per argument set for ttl seconds.
+
+    A per-key lock makes concurrent misses wait for the first request's
+    query instead of each running their own. Entries store their expiry so
+    inserts can prune expired keys and cap the cache at CACHE_MAX_KEYS.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+
+            def fresh():
+                hit = _response_cache.get(key)
+                if hit and hit[0] == _cache_generation and time.monotonic() < hit[1]:
+                    return hit
+                return None
+
+            hit = fresh()
+            if hit:
+                return hit[2]
+            async with _cache_locks.setdefault(key, asyncio.Lock()):
+                hit = fresh()
+                if hit:
+                    return hit[2]
+                generation = _cache_generation
+                value = await fn(*args, **kwargs)
+                _response_cache.pop(key, None)
+                _response_cache[key] = (generation, time.monotonic() + ttl, value)
+                _prune_response_cache()
+                return value
+
+        return wrapper
+
+    return decorator
+
+
+def _prune_response_cache():
+    """Drop expired or stale entries, then the oldest past CACHE_MAX_KEYS."""
+    now = time.monotonic()
+    for key, (generation, expires_at, _) in list(_response_cache.items()):
+        if generation != _cache_generation or now >= expires_at:
+            del _response_cache[key]
+    while len(_response_cache) > CACHE_MAX_KEYS:
+        del _response_cache[next(iter(_response_cache))]
+    # A held lock still has waiters that will look the key up again
+    for key, lock in list(_cache_locks.items()):
+        if key not in _response_cache and not lock.locked():
+            del _cache_locks[key]
+
+
+def invalidate_response_cache():
+    """Make every cached response stale after a write."""
+    global _cache_generation
+    _cache_generation += 1
+
+
 # ---- Endpoints ----
 
 @app.get("/health")
@@ -82,105 +216,99 @@ def health_check():
 
 
 @app.get("/pipelines")
-def list_pipelines():
+@async_ttl_cache()
+async def list_pipelines():
     """List all pipelines with their current status."""
+    # latest_* columns are maintained by a trigger on pipeline_runs (migrations.sql)
     sql = """
         SELECT
             p.pipeline_id, p.pipeline_name, p.description, p.schedule,
             p.sla_minutes, p.owner,
-            lr.status AS last_run_status,
-            lr.started_at AS last_run_at,
-            lr.duration_seconds,
-            lr.error_message
+            p.latest_run_status AS last_run_status,
+            p.latest_run_started_at AS last_run_at,
+            p.latest_duration_s AS duration_seconds,
+            p.latest_error_message AS error_message
         FROM pipeline_meta.pipelines p
-        LEFT JOIN LATERAL (
-            SELECT * FROM pipeline_meta.pipeline_runs pr
-            WHERE pr.pipeline_id = p.pipeline_id
-            ORDER BY pr.started_at DESC LIMIT 1
-        ) lr ON true
         WHERE p.is_active = true
         ORDER BY p.pipeline_name;
     """
-    results = execute_query(sql)
+    results = await asyncio.to_thread(execute_prepared, "list_pipelines", sql)
     return {"pipelines": results}
 
 
 @app.get("/pipelines/{pipeline_name}")
-def get_pipeline_detail(pipeline_name: str):
+async def get_pipeline_detail(pipeline_name: str):
     """Get detailed info for a specific pipeline."""
-    # Pipeline info
-    pipeline_sql = """
-        SELECT * FROM pipeline_meta.pipelines WHERE pipeline_name = %s;
-    """
-    pipeline = execute_query(pipeline_sql, (pipeline_name,))
-    if not pipeline:
-        raise HTTPException(status_code=404, detail=f"Pipeline '{pipeline_name}' not found")
-
-    # Recent runs
-    runs_sql = """
-        SELECT * FROM pipeline_meta.pipeline_runs pr
-        JOIN pipeline_meta.pipelines p ON p.pipeline_id = pr.pipeline_id
+    # Pipeline info, recent runs and dependencies in one round-trip
+    sql = """
+        SELECT
+            to_jsonb(p) AS pipeline,
+            (
+                SELECT COALESCE(jsonb_agg(to_jsonb(pr) || to_jsonb(p) ORDER BY pr.started_at DESC), '[]'::jsonb)
+                FROM (
+                    SELECT * FROM pipeline_meta.pipeline_runs
+                    WHERE pipeline_id = p.pipeline_id
+                    ORDER BY started_at DESC LIMIT 20
+                ) pr
+            ) AS recent_runs,
+            (
+                SELECT COALESCE(jsonb_agg(p2.pipeline_name), '[]'::jsonb)
+                FROM pipeline_meta.dependencies d
+                JOIN pipeline_meta.pipelines p2 ON p2.pipeline_id = d.depends_on_pipeline_id
+                WHERE d.pipeline_id = p.pipeline_id
+            ) AS dependencies
+        FROM pipeline_meta.pipelines p
         WHERE p.pipeline_name = %s
-        ORDER BY pr.started_at DESC LIMIT 20;
+        ORDER BY p.pipeline_id
+        LIMIT 1;
     """
-    runs = execute_query(runs_sql, (pipeline_name,))
-
-    # Dependencies
-    deps_sql = """
-        SELECT p2.pipeline_name AS depends_on
-        FROM pipeline_meta.dependencies d
-        JOIN pipeline_meta.pipelines p ON p.pipeline_id = d.pipeline_id
-        JOIN pipeline_meta.pipelines p2 ON p2.pipeline_id = d.depends_on_pipeline_id
-        WHERE p.pipeline_name = %s;
-    """
-    deps = execute_query(deps_sql, (pipeline_name,))
-
-    return {
-        "pipeline": pipeline[0],
-        "recent_runs": runs,
-        "dependencies": [d["depends_on"] for d in deps],
-    }
+    rows = await asyncio.to_thread(execute_query, sql, (pipeline_name,))
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"Pipeline '{pipeline_name}' not found")
+    return rows[0]
 
 
-@app.post("/check")
-def trigger_health_check():
-    """Trigger a full pipeline health check via the Monitor Agent."""
-    from src.config.db import execute_write
-    result = run_health_check()
-    # Always log the health check action so it shows in the dashboard
+async def _log_health_check(result: str):
+    """Record a health check in agent_actions so it shows in the dashboard."""
     try:
         summary = str(result)[:500] if result else "Health check completed"
-        execute_write("""
+        await asyncio.to_thread(execute_write, """
             INSERT INTO pipeline_meta.agent_actions
                 (agent_name, action_type, summary, confidence_score)
             VALUES ('monitor', 'health_check', %s, 0.95)
         """, (summary,))
     except Exception:
         pass
+    invalidate_response_cache()
+
+
+@app.post("/check")
+async def trigger_health_check(background_tasks: BackgroundTasks):
+    """Trigger a full pipeline health check via the Monitor Agent."""
+    result = await asyncio.to_thread(run_health_check)
+    # Logged after the response is sent so the client does not wait on the insert
+    background_tasks.add_task(_log_health_check, result)
+    invalidate_response_cache()
     return {"result": result}
 
 
 @app.post("/diagnose")
-def diagnose(alert: AlertRequest):
+async def diagnose(alert: AlertRequest):
     """Diagnose a specific pipeline alert."""
-    result = diagnose_alert(alert.model_dump())
+    result = await asyncio.to_thread(diagnose_alert, alert.model_dump())
     return {"diagnosis": result}
 
 
 @app.post("/repair")
-def repair(diagnosis: DiagnosisRequest):
+async def repair(diagnosis: DiagnosisRequest):
     """Generate a fix proposal for a diagnosed issue."""
-    result = propose_fix(diagnosis.model_dump())
+    result = await asyncio.to_thread(propose_fix, diagnosis.model_dump())
+    invalidate_response_cache()
     return {"fix_proposal": result}
 
 
 # ---- Persistent Chat Agent ----
 
-import threading
-from strands import Agent
-from strands.models import BedrockModel
-from src.mcp_server.tools import ALL_TOOLS
-
 CHAT_PROMPT = """You are the Orchestrator for Agentic Pipeline Repair, running in a web chat.
 
 You help users monitor, diagnose, and repair data pipeline issues.
@@ -195,55 +323,98 @@ RULES:
 """
 
 _chat_agent = None
+# The agent holds mutable conversation state, so only one turn runs at a time
+_chat_lock = asyncio.Lock()
 
 def _get_chat_agent():
     global _chat_agent
     if _chat_agent is None:
-        model = BedrockModel(
-            model_id=settings.NOVA_MODEL_ID,
-            region_name=settings.AWS_REGION,
-            additional_request_fields={
-                "reasoningConfig": {"type": "enabled", "maxReasoningEffort": "medium"}
-            },
+        # No callback handler: replies are returned or streamed to the client, not printed
+        _chat_agent = Agent(
+            model=get_bedrock_model("medium", cache_prompt=True),
+            system_prompt=CHAT_PROMPT,
+            tools=ALL_TOOLS,
+            callback_handler=None,
         )
-        _chat_agent = Agent(model=model, system_prompt=CHAT_PROMPT, tools=ALL_TOOLS)
     return _chat_agent
 
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
-    """Interactive chat with persistent conversation history."""
-    agent = _get_chat_agent()
-    result = {"response": ""}
-    error = {"msg": None}
-
-    def run():
-        try:
-            result["response"] = str(agent(request.message))
-        except Exception as e:
-            error["msg"] = str(e)
+def _finish_chat_turn(task: asyncio.Task):
+    _chat_lock.release()
+    if not task.cancelled():
+        task.exception()  # Mark as retrieved; timed-out turns have no awaiting caller
 
-    t = threading.Thread(target=run)
-    t.start()
-    t.join(timeout=120)
 
-    if t.is_alive():
+@app.post("/chat", response_model=ChatResponse, deprecated=True)
+async def chat(request: ChatRequest):
+    """Interactive chat with persistent conversation history (prefer /chat/stream)."""
+    await _chat_lock.acquire()
+    try:
+        task = asyncio.create_task(asyncio.to_thread(_get_chat_agent(), request.message))
+    except Exception:
+        _chat_lock.release()
+        raise
+    # A running thread cannot be interrupted, so the lock is held until the turn
+    # really finishes, even after a timeout; the next message then sees a
+    # consistent conversation
+    task.add_done_callback(_finish_chat_turn)
+    try:
+        # shield() keeps the timeout from abandoning the task while it still owns the agent
+        response = await asyncio.wait_for(asyncio.shield(task), timeout=120)
+    except asyncio.TimeoutError:
         return ChatResponse(response="Request timed out. Try a more specific question.")
-    if error["msg"]:
-        return ChatResponse(response=f"Error: {error['msg']}")
-    return ChatResponse(response=result["response"])
+    except Exception as e:
+        return ChatResponse(response=f"Error: {e}")
+    # The chat agent can apply fixes and run dbt
+    invalidate_response_cache()
+    return ChatResponse(response=str(response))
+
+
+@app.get("/chat/stream")
+async def chat_stream(message: str):
+    """Stream the chat reply as Server-Sent Events, for use with EventSource.
+
+    Each ``data:`` event carries a JSON object: ``{"text": ...}`` for reply
+    tokens, ``{"tool": ...}`` when the agent calls a tool, and ``{"error": ...}``
+    on failure. A final ``event: done`` closes the stream. Closing the
+    connection stops the agent turn.
+    """
+    async def events():
+        async with _chat_lock:
+            tool_ids = set()
+            try:
+                async for event in _get_chat_agent().stream_async(message):
+                    tool_use = event.get("current_tool_use")
+                    if tool_use and tool_use.get("toolUseId") not in tool_ids:
+                        tool_ids.add(tool_use.get("toolUseId"))
+                        yield f"data: {json.dumps({'tool': tool_use.get('name')})}\n\n"
+                    if "data" in event:
+                        yield f"data: {json.dumps({'text': event['data']})}\n\n"
+            except Exception as e:
+                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            # The chat agent can apply fixes and run dbt
+            invalidate_response_cache()
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/chat/reset")
-def reset_chat():
+async def reset_chat():
     """Reset chat agent and conversation history."""
     global _chat_agent
-    _chat_agent = None
+    async with _chat_lock:
+        _chat_agent = None
     return {"status": "reset"}
 
 
 @app.get("/actions")
-def get_recent_actions(limit: int = 50):
+@async_ttl_cache()
+async def get_recent_actions(limit: int = 50):
     """Get recent agent actions for the dashboard."""
     sql = """
         SELECT
@@ -253,33 +424,36 @@ def get_recent_actions(limit: int = 50):
         FROM pipeline_meta.agent_actions aa
         LEFT JOIN pipeline_meta.pipelines p ON p.pipeline_id = aa.pipeline_id
         ORDER BY aa.created_at DESC
-        LIMIT %s;
+        LIMIT $1;
     """
-    results = execute_query(sql, (limit,))
-    return {"actions": results}
 
+    def fetch() -> list[dict]:
+        # Agent actions are queued by default; write them out so the feed (and the
+        # cached copy of it) includes alerts logged by a check that just finished
+        flush_agent_actions()
+        return execute_prepared("recent_actions", sql, (limit,))
 
-# ---- Verification ----
+    results = await asyncio.to_thread(fetch)
+    return {"actions": results}
 
-class VerifyRequest(BaseModel):
-    pipeline_name: str
-    fix_description: str
 
+# ---- Verification ----
 
 @app.post("/verify")
-def verify(request: VerifyRequest):
+async def verify(request: VerifyRequest):
     """Verify that an applied fix resolved the issue."""
-    result = verify_fix(request.pipeline_name, request.fix_description)
+    result = await asyncio.to_thread(verify_fix, request.pipeline_name, request.fix_description)
     return {"verification": result}
 
 
 # ---- Scheduler ----
 
 @app.post("/scheduler/start")
-def start_scheduler(interval_minutes: int = 5):
+async def start_scheduler(interval_minutes: int = 5):
     """Start automated pipeline health checks."""
     scheduler.interval = interval_minutes * 60
-    scheduler.start()
+    if not await asyncio.to_thread(scheduler.start):
+        return {"status": "already running on another worker", **scheduler.status()}
     return scheduler.status()
 
 
@@ -299,11 +473,11 @@ def scheduler_status():
 # ---- Failure Patterns ----
 
 @app.get("/patterns")
-def get_patterns():
+@async_ttl_cache()
+async def get_patterns():
     """Get historical failure patterns across all pipelines."""
-    from src.mcp_server.tools import get_failure_patterns
-    result = get_failure_patterns.fn()
-    return {"patterns": json.loads(result)}
+    # Rows go straight to the response instead of through the tool's JSON string
+    return {"patterns": await asyncio.to_thread(failure_pattern_rows)}
 
 
 # ---- Dashboard ----
@@ -311,10 +485,13 @@ def get_patterns():
 DASHBOARD_DIR = Path(__file__).resolve().parent.parent.parent / "dashboard"
 
 
-@app.get("/")
-def serve_dashboard():
-    """Serve the React dashboard."""
-    index_path = DASHBOARD_DIR / "index.html"
-    if index_path.exists():
-        return FileResponse(str(index_path))
-    return {"message": "Dashboard not found. Place index.html in /dashboard/"}
+if DASHBOARD_DIR.is_dir():
+    # Mounted last so it only sees paths no API route matched. StaticFiles serves
+    # index.html for "/", answers conditional GETs with 304 and streams files
+    # from disk.
+    app.mount("/", StaticFiles(directory=DASHBOARD_DIR, html=True), name="dashboard")
+else:
+    @app.get("/")
+    def serve_dashboard():
+        """Placeholder when the React dashboard is not deployed."""
+        return {"message": "Dashboard not found. Place index.html in /dashboard/"}
@@ -1,13 +1,55 @@
 """Database utilities for pipeline metadata queries."""
 
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Any
+
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
-from typing import Any
+import psycopg2.pool
 from src.config.settings import settings
 
+_pool = None
+_pool_lock = threading.Lock()
 
-def get_connection():
-    """Get a PostgreSQL connection."""
+
+class _Connection(psycopg2.extensions.connection):
+    """Connection that remembers which named statements its session has prepared."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: set[str] = set()
+
+
+def _get_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    """Create the shared connection pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Bounded so agent fan-out cannot open more sessions than Postgres handles well
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    settings.POSTGRES_POOL_MIN,
+                    settings.POSTGRES_POOL_MAX,
+                    host=settings.POSTGRES_HOST,
+                    port=settings.POSTGRES_PORT,
+                    dbname=settings.POSTGRES_DB,
+                    user=settings.POSTGRES_USER,
+                    password=settings.POSTGRES_PASSWORD,
+                    connection_factory=_Connection,
+                )
+                atexit.register(_pool.closeall)
+    return _pool
+
+
+def open_connection():
+    """Open a dedicated connection outside the pool.
+
+    For session-scoped state such as advisory locks, which must not be handed
+    to other callers through the pool. The caller closes it.
+    """
     return psycopg2.connect(
         host=settings.POSTGRES_HOST,
         port=settings.POSTGRES_PORT,
@@ -17,35 +59,150 @@ def get_connection():
     )
 
 
-def execute_query(sql: str, params: tuple = None, read_only: bool = True) -> list[dict]:
-    """Execute a SQL query and return results as list of dicts."""
-    conn = get_connection()
+def init_pool() -> None:
+    """Open the pool's minimum connections now rather than on the first query."""
+    _get_pool()
+
+
+def close_pool() -> None:
+    """Close every pooled connection; the next query opens a new pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def get_connection():
+    """Borrow a PostgreSQL connection from the pool for the duration of a with block."""
+    pool = _get_pool()
+    conn = pool.getconn()
     try:
-        if read_only:
-            conn.set_session(readonly=True)
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, params)
-            if cur.description:
-                return [dict(row) for row in cur.fetchall()]
-            conn.commit()
-            return []
-    except Exception as e:
-        conn.rollback()
-        raise e
+        yield conn
     finally:
-        conn.close()
+        pool.putconn(conn)
+
+
+def execute_query(sql: str, params: tuple = None, read_only: bool = True, timeout_ms: int = None) -> list[dict]:
+    """Execute a SQL query and return results as list of dicts.
+
+    ``timeout_ms`` sets a statement_timeout for this transaction only.
+    """
+    with get_connection() as conn:
+        try:
+            # Set on every call so a pooled connection never carries the flag over.
+            # psycopg2 only records it client-side and sends it as part of the
+            # transaction's BEGIN, so this costs no extra round-trip.
+            conn.readonly = read_only
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                if timeout_ms is not None:
+                    # Its own statement, so sql is never sent as part of a multi-statement string
+                    cur.execute("SET LOCAL statement_timeout = %s", (int(timeout_ms),))
+                cur.execute(sql, params)
+                # RealDictRow is already a dict subclass; copying each row again doubles the work
+                rows = cur.fetchall() if cur.description else []
+            conn.commit()
+            return rows
+        except Exception as e:
+            conn.rollback()
+            raise e
+
+
+def execute_query_columnar(sql: str, params: tuple = None) -> tuple[list[str], list[tuple]]:
+    """Run a read query and return (column names, rows as plain tuples).
+
+    For wide or long results where a dict per row would repeat every column
+    name.
+    """
+    with get_connection() as conn:
+        try:
+            conn.readonly = True
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall() if cur.description else []
+                columns = [col.name for col in cur.description] if cur.description else []
+            conn.commit()
+            return columns, rows
+        except Exception as e:
+            conn.rollback()
+            raise e
+
+
+def execute_prepared(name: str, sql: str, params: tuple = ()) -> list[dict]:
+    """Run a read query as a server-side prepared statement.
+
+    The statement is parsed and planned once per pooled connection (PREPARE)
+    and each later call only sends EXECUTE with the parameters. ``sql`` uses
+    Postgres' $1, $2 placeholders and must be the same for every call with
+    the same ``name``.
+    """
+    with get_connection() as conn:
+        try:
+            conn.readonly = True
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                if name not in conn.prepared:
+                    # PREPARE is not transactional, so a later rollback keeps it
+                    cur.execute(f"PREPARE {name} AS {sql}")
+                    conn.prepared.add(name)
+                if params:
+                    cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+                else:
+                    cur.execute(f"EXECUTE {name}")
+                rows = cur.fetchall()
+            conn.commit()
+            return rows
+        except Exception as e:
+            conn.rollback()
+            raise e
 
 
 def execute_write(sql: str, params: tuple = None) -> int:
     """Execute a write query and return affected row count."""
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(sql, params)
+    with get_connection() as conn:
+        try:
+            conn.readonly = False
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                conn.commit()
+                return cur.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise e
+
+
+def execute_script(sql: str, params: tuple = None) -> None:
+    """Execute several semicolon-separated statements in a single transaction.
+
+    The whole script is sent in one round-trip; if any statement fails the
+    entire batch is rolled back.
+    """
+    with get_connection() as conn:
+        try:
+            conn.readonly = False
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
             conn.commit()
-            return cur.rowcount
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+        except Exception as e:
+            conn.rollback()
+            raise e
+
+
+def execute_write_fast(sql: str, params: tuple = None) -> int:
+    """Execute a write script without waiting for the WAL flush on commit.
+
+    Sends ``SET LOCAL synchronous_commit = OFF`` together with the script in one
+    round-trip. A crash may lose the last few commits, so only use this for
+    disposable demo/seed data; agent and pipeline writes keep execute_write.
+    Returns the row count of the last statement.
+    """
+    with get_connection() as conn:
+        try:
+            conn.readonly = False
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL synchronous_commit = OFF;\n" + sql, params)
+                conn.commit()
+                return cur.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise e
@@ -0,0 +1,177 @@
+"""Shared Amazon Bedrock model clients and agent reuse for all agents.
+
+Agent prompts keep a fixed instruction block first and the per-call data
+last, serialized with prompt_payload(). Identical inputs therefore always
+produce identical prompt bytes, which keeps Bedrock prompt-cache prefixes
+and the fix cache keys stable; never format dicts or lists into a prompt
+with str() or an f-string.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from functools import lru_cache, wraps
+from typing import Callable, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from strands import Agent
+from strands.models import BedrockModel
+from strands.types.exceptions import ModelThrottledException
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_BOTO_CONFIG = Config(
+    max_pool_connections=20,
+    retries={"mode": "adaptive", "max_attempts": 5},
+    tcp_keepalive=True,
+)
+
+# Creating clients from one boto3 Session is not thread-safe
+_session_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _get_boto_session() -> boto3.Session:
+    """One boto3 Session (credentials and endpoint resolution) shared by every model."""
+    return boto3.Session(region_name=settings.AWS_REGION)
+
+
+def warm_up() -> None:
+    """Resolve AWS credentials now so the first Bedrock call does not pay for it."""
+    _get_boto_session().get_credentials()
+
+
+@lru_cache(maxsize=8)
+def get_bedrock_model(reasoning: Optional[str] = None, cache_prompt: bool = False) -> BedrockModel:
+    """Return the shared Nova model, one instance per configuration.
+
+    Agents hold their own conversation state, so a single model (and its
+    underlying boto3 client and HTTP connection pool) can back any number of them.
+
+    Args:
+        reasoning: Nova maxReasoningEffort ("low", "medium", "high"), or None to disable extended thinking.
+        cache_prompt: Place a Bedrock cache point after the system prompt so repeated
+            turns reuse the cached prefix. The system prompt must be byte-identical
+            between calls for this to hit.
+    """
+    kwargs = {}
+    if cache_prompt:
+        kwargs["cache_prompt"] = "default"
+    if reasoning:
+        kwargs["additional_request_fields"] = {
+            "reasoningConfig": {
+                "type": "enabled",
+                "maxReasoningEffort": reasoning,
+            }
+        }
+
+    with _session_lock:
+        return BedrockModel(
+            model_id=settings.NOVA_MODEL_ID,
+            boto_session=_get_boto_session(),
+            boto_client_config=_BOTO_CONFIG,
+            **kwargs,
+        )
+
+
+def thread_local_agent(factory: Callable[..., Agent]) -> Callable[..., Agent]:
+    """Wrap an agent factory so each thread reuses the Agent it built.
+
+    An Agent keeps conversation history and must not be invoked from two
+    threads at once, so instances are per thread and per factory arguments,
+    and every call hands back the agent with an empty conversation.
+    """
+    local = threading.local()
+
+    @wraps(factory)
+    def get(*args) -> Agent:
+        agents = local.__dict__.setdefault("agents", {})
+        agent = agents.get(args)
+        if agent is None:
+            agent = agents[args] = factory(*args)
+        else:
+            agent.messages.clear()
+        return agent
+
+    return get
+
+
+def prompt_payload(data: dict) -> str:
+    """Serialize per-call prompt data canonically (sorted keys, no whitespace)."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Bedrock while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stop calling a failing dependency for a while after repeated errors.
+
+    After fail_max consecutive failures the breaker opens and every call is
+    rejected for reset_timeout seconds; the first call after that is let
+    through, and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 60):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("Bedrock circuit breaker is open; skipping call")
+            # Half-open: allow this call through; failing it re-opens immediately
+            self._opened_at = None
+            self._failures = self.fail_max - 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+
+
+_bedrock_breaker = CircuitBreaker(fail_max=5, reset_timeout=60)
+
+# Throttling and transport errors; anything else (bad prompt, tool bug) is not retried
+_RETRYABLE_ERRORS = (ModelThrottledException, ClientError, BotoCoreError)
+
+
+def invoke_agent(agent: Agent, prompt: str, attempts: int = 4, max_delay: float = 8.0):
+    """Call an agent, retrying Bedrock errors with jittered exponential backoff.
+
+    Retries restart the conversation from the prompt. All calls share one
+    circuit breaker, so a Bedrock outage fails fast instead of stalling
+    every agent for the full retry budget.
+    """
+    for attempt in range(1, attempts + 1):
+        _bedrock_breaker.before_call()
+        try:
+            response = agent(prompt)
+        except _RETRYABLE_ERRORS as e:
+            _bedrock_breaker.record_failure()
+            if attempt == attempts:
+                raise
+            delay = min(max_delay, 2 ** (attempt - 1)) + random.uniform(0, 1)
+            logger.warning("Bedrock call failed (%s); retry %d/%d in %.1fs", e, attempt, attempts - 1, delay)
+            time.sleep(delay)
+            agent.messages.clear()
+            continue
+        _bedrock_breaker.record_success()
+        return response
@@ -0,0 +1,45 @@
+"""Logging setup shared by the API, scheduler and CLIs.
+
+Records are put on an in-memory queue by the calling thread and written to
+the terminal by a single background listener thread, so agent workers never
+block on stdout.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def setup_logging(handler: Optional[logging.Handler] = None, level: Optional[str] = None) -> None:
+    """Route root logging through a QueueHandler drained by a background listener.
+
+    Safe to call more than once; only the first call takes effect.
+
+    Args:
+        handler: Handler the listener writes to. Defaults to a StreamHandler on stderr.
+        level: Root log level. Defaults to the LOG_LEVEL env var, or INFO.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+
+        if handler is None:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        root.setLevel(level or os.getenv("LOG_LEVEL", "INFO").upper())
+
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
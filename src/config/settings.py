@@ -1,6 +1,8 @@
 """Application settings loaded from environment variables."""
 
 import os
+from functools import cached_property
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,8 +19,10 @@ class Settings:
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "pipeline_agent")
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "pipeline_admin")
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "")
+    POSTGRES_POOL_MIN: int = int(os.getenv("POSTGRES_POOL_MIN", "2"))
+    POSTGRES_POOL_MAX: int = int(os.getenv("POSTGRES_POOL_MAX", "10"))
 
-    @property
+    @cached_property
     def database_url(self) -> str:
         return (
             f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
@@ -28,6 +32,8 @@ class Settings:
     # App
     APP_ENV: str = os.getenv("APP_ENV", "development")
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # Indent tool results for reading by hand; agents get compact JSON
+    TOOLS_PRETTY_JSON: bool = os.getenv("TOOLS_PRETTY_JSON") == "1"
 
 
 settings = Settings()
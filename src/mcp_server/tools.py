@@ -20,20 +20,174 @@ Tools (16 total):
 - get_failure_patterns: Analyze recurring failures
 """
 
-import json
+import atexit
+import inspect
+import logging
 import os
+import queue
+import re
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Any
+from functools import lru_cache, wraps
+from typing import Any, Optional
+
+import orjson
 from strands import tool
-from src.config.db import execute_query, execute_write
+from src.config.db import (
+    execute_prepared,
+    execute_query,
+    execute_query_columnar,
+    execute_write,
+    init_pool,
+)
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
 
 DBT_PROJECT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "dbt_project")
 
 
+def _dump(obj: Any, pretty: bool = settings.TOOLS_PRETTY_JSON) -> str:
+    """Serialize a tool result as JSON; values orjson has no encoder for fall back to str().
+
+    Compact unless pretty, since indentation only costs the agent context tokens.
+    """
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0, default=str).decode()
+
+
+def _error(message: str) -> str:
+    """Compact JSON error result, which shared_cache recognises and never caches."""
+    return orjson.dumps({"error": message}).decode()
+
+
+# Tool results shared by every agent working the same incident, so the Repair and
+# Verification agents reuse what Diagnostics already read instead of re-fetching it.
+# Every TTL is a few seconds: health checks, chat and the CLIs never clear this,
+# so a long TTL would hide fresh schema drift or failed runs from them.
+# Keyed by (tool name, arguments); cleared by the orchestrator per incident and by
+# any tool that changes dbt models or the tables they build.
+_shared_state: dict[tuple, tuple[float, str]] = {}
+_shared_state_lock = threading.Lock()
+
+
+def clear_shared_state() -> None:
+    """Drop all shared tool results, including cached diagnostic queries."""
+    with _shared_state_lock:
+        _shared_state.clear()
+    with _diag_cache_lock:
+        _diag_cache.clear()
+
+
+def shared_cache(ttl: int = 5):
+    """Serve repeated calls to a read-only tool from the shared state for ttl seconds.
+
+    Error results are never cached.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (fn.__name__, tuple(bound.arguments.items()))
+            now = time.monotonic()
+            with _shared_state_lock:
+                hit = _shared_state.get(key)
+            if hit is not None and now - hit[0] < ttl:
+                return hit[1]
+
+            result = fn(*args, **kwargs)
+            if not result.startswith('{"error"'):
+                with _shared_state_lock:
+                    _shared_state[key] = (now, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# dbt model name -> (absolute path, path relative to the dbt project, category),
+# rebuilt only when one of the model directories changes
+_model_index: dict[str, tuple[str, str, str]] = {}
+_model_index_dirs: dict[str, int] = {}
+_model_index_lock = threading.Lock()
+# list_dbt_models output for the index object it was rendered from
+_models_json: Optional[tuple[dict, str]] = None
+
+
+def _get_model_index() -> dict[str, tuple[str, str, str]]:
+    """Return the dbt model index, re-walking models/ only if a directory's mtime changed.
+
+    Adding, removing or renaming a file updates its directory's mtime, so
+    stat-ing the known directories is enough to detect a stale index.
+    """
+    global _model_index, _model_index_dirs
+    with _model_index_lock:
+        try:
+            fresh = bool(_model_index_dirs) and all(
+                os.stat(d).st_mtime_ns == mtime for d, mtime in _model_index_dirs.items()
+            )
+        except FileNotFoundError:
+            fresh = False
+        if fresh:
+            return _model_index
+
+        index, dirs = {}, {}
+        try:
+            for filepath, category in _iter_sql(os.path.join(DBT_PROJECT_PATH, "models"), dirs):
+                name = os.path.basename(filepath)[:-4]
+                index.setdefault(name, (filepath, os.path.relpath(filepath, DBT_PROJECT_PATH), category))
+        except FileNotFoundError:
+            index, dirs = {}, {}
+        _model_index, _model_index_dirs = index, dirs
+        return index
+
+
+def _iter_sql(root: str, dirs: dict[str, int]):
+    """Yield (path, parent directory name) for every .sql file under root, recording directory mtimes.
+
+    Uses os.scandir so file/directory checks come from the directory listing
+    instead of a stat per entry. A directory's own files are yielded before
+    its subdirectories, the same order os.walk visited them in.
+    """
+    dirs[root] = os.stat(root).st_mtime_ns
+    category = os.path.basename(root)
+    subdirs = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.endswith(".sql"):
+                yield entry.path, category
+    for subdir in subdirs:
+        yield from _iter_sql(subdir, dirs)
+
+
+@lru_cache(maxsize=256)
+def _render_model_sql(model_name: str, filepath: str, rel_path: str, mtime_ns: int) -> str:
+    """get_dbt_model_sql's result for one version of a model file.
+
+    The mtime in the key makes an edited file a cache miss, so repeat reads
+    skip both the file read and the JSON encode.
+    """
+    with open(filepath, "r") as fh:
+        sql_content = fh.read()
+    return _dump({
+        "model_name": model_name,
+        "path": rel_path,
+        "sql": sql_content,
+    })
+
+
 @tool
+@shared_cache(ttl=10)
 def get_pipeline_status() -> str:
     """Get the current status of all pipelines including last run info and SLA status.
     Returns a summary of each pipeline with its latest run status, duration, and whether it met SLA."""
+    # latest_* columns are maintained by a trigger on pipeline_runs (migrations.sql)
     sql = """
         SELECT
             p.pipeline_id,
@@ -41,35 +195,29 @@ def get_pipeline_status() -> str:
             p.schedule,
             p.sla_minutes,
             p.owner,
-            lr.status AS last_run_status,
-            lr.started_at AS last_run_started,
-            lr.duration_seconds AS last_run_duration_sec,
-            lr.row_count AS last_run_rows,
-            lr.error_message,
+            p.latest_run_status AS last_run_status,
+            p.latest_run_started_at AS last_run_started,
+            p.latest_duration_s AS last_run_duration_sec,
+            p.latest_row_count AS last_run_rows,
+            p.latest_error_message AS error_message,
             CASE
-                WHEN lr.duration_seconds > p.sla_minutes * 60 THEN 'SLA_BREACHED'
-                WHEN lr.status = 'failed' THEN 'FAILED'
-                WHEN lr.status = 'running' THEN 'RUNNING'
+                WHEN p.latest_duration_s > p.sla_minutes * 60 THEN 'SLA_BREACHED'
+                WHEN p.latest_run_status = 'failed' THEN 'FAILED'
+                WHEN p.latest_run_status = 'running' THEN 'RUNNING'
                 ELSE 'HEALTHY'
             END AS health_status
         FROM pipeline_meta.pipelines p
-        LEFT JOIN LATERAL (
-            SELECT * FROM pipeline_meta.pipeline_runs pr
-            WHERE pr.pipeline_id = p.pipeline_id
-            ORDER BY pr.started_at DESC
-            LIMIT 1
-        ) lr ON true
         WHERE p.is_active = true
         ORDER BY
             CASE
-                WHEN lr.status = 'failed' THEN 0
-                WHEN lr.duration_seconds > p.sla_minutes * 60 THEN 1
+                WHEN p.latest_run_status = 'failed' THEN 0
+                WHEN p.latest_duration_s > p.sla_minutes * 60 THEN 1
                 ELSE 2
             END,
             p.pipeline_name;
     """
-    results = execute_query(sql)
-    return json.dumps(results, default=str, indent=2)
+    results = execute_prepared("pipeline_status", sql)
+    return _dump(results)
 
 
 @tool
@@ -80,35 +228,37 @@ def get_pipeline_dag(pipeline_name: str) -> str:
     Args:
         pipeline_name: Name of the pipeline to get dependencies for.
     """
+    # One pass over dependencies: an edge out of the target is upstream, an edge
+    # into it is downstream. Sorted upstream, target, downstream as before.
     sql = """
         WITH target AS (
-            SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = %s
-        ),
-        upstream AS (
-            SELECT p.pipeline_name, 'upstream' AS direction
-            FROM pipeline_meta.dependencies d
-            JOIN pipeline_meta.pipelines p ON p.pipeline_id = d.depends_on_pipeline_id
-            WHERE d.pipeline_id = (SELECT pipeline_id FROM target)
-        ),
-        downstream AS (
-            SELECT p.pipeline_name, 'downstream' AS direction
-            FROM pipeline_meta.dependencies d
-            JOIN pipeline_meta.pipelines p ON p.pipeline_id = d.pipeline_id
-            WHERE d.depends_on_pipeline_id = (SELECT pipeline_id FROM target)
+            SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = $1
         )
-        SELECT * FROM upstream
-        UNION ALL
-        SELECT %s, 'target'
-        UNION ALL
-        SELECT * FROM downstream;
+        SELECT pipeline_name, direction
+        FROM (
+            SELECT
+                p.pipeline_name,
+                CASE WHEN d.pipeline_id = t.pipeline_id THEN 'upstream' ELSE 'downstream' END AS direction
+            FROM target t
+            JOIN pipeline_meta.dependencies d
+                ON t.pipeline_id IN (d.pipeline_id, d.depends_on_pipeline_id)
+            JOIN pipeline_meta.pipelines p
+                ON p.pipeline_id = CASE WHEN d.pipeline_id = t.pipeline_id
+                                        THEN d.depends_on_pipeline_id ELSE d.pipeline_id END
+            UNION ALL
+            SELECT $1, 'target'
+        ) dag
+        ORDER BY CASE direction WHEN 'upstream' THEN 0 WHEN 'target' THEN 1 ELSE 2 END;
     """
-    results = execute_query(sql, (pipeline_name, pipeline_name))
-    return json.dumps(results, default=str, indent=2)
+    results = execute_prepared("pipeline_dag", sql, (pipeline_name,))
+    return _dump(results)
 
 
 @tool
+@shared_cache(ttl=5)
 def get_run_history(pipeline_name: str, limit: int = 10) -> str:
     """Get recent run history for a pipeline including status, duration, row counts, and errors.
+    Returns {"columns": [...], "rows": [[...], ...]}, one row per run, newest first.
 
     Args:
         pipeline_name: Name of the pipeline.
@@ -130,11 +280,13 @@ def get_run_history(pipeline_name: str, limit: int = 10) -> str:
         ORDER BY pr.started_at DESC
         LIMIT %s;
     """
-    results = execute_query(sql, (pipeline_name, limit))
-    return json.dumps(results, default=str, indent=2)
+    # limit is caller-controlled, so send column names once instead of per run
+    columns, rows = execute_query_columnar(sql, (pipeline_name, limit))
+    return _dump({"columns": columns, "rows": rows})
 
 
 @tool
+@shared_cache(ttl=5)
 def get_schema_info(table_name: str) -> str:
     """Get the current schema for a table and compare with the last snapshot to detect drift.
     Returns column names, types, and any differences from the last recorded snapshot.
@@ -144,46 +296,68 @@ def get_schema_info(table_name: str) -> str:
     """
     parts = table_name.split(".")
     if len(parts) != 2:
-        return json.dumps({"error": "Table name must be schema.table format (e.g., 'raw.customers')"})
+        return _error("Table name must be schema.table format (e.g., 'raw.customers')")
 
     schema_name, tbl_name = parts
 
-    # Current schema from information_schema
-    current_sql = """
-        SELECT column_name, data_type, is_nullable, ordinal_position
-        FROM information_schema.columns
-        WHERE table_schema = %s AND table_name = %s
-        ORDER BY ordinal_position;
-    """
-    current = execute_query(current_sql, (schema_name, tbl_name))
-
-    # Last snapshot
-    snapshot_sql = """
-        SELECT column_name, data_type, is_nullable, ordinal_position
-        FROM pipeline_meta.schema_snapshots
-        WHERE table_name = %s
-        ORDER BY ordinal_position;
+    # Current schema and last snapshot joined by column name, so Postgres hands back
+    # one row per column already classified as added/removed/same. information_schema
+    # uses its own domain types and 'YES'/'NO' for nullability, so its columns are cast
+    # to plain types and the snapshot's boolean is rendered the same way.
+    sql = """
+        WITH cur AS (
+            SELECT column_name::text, data_type::text, is_nullable::text, ordinal_position::int
+            FROM information_schema.columns
+            WHERE table_schema = $1 AND table_name = $2
+        ),
+        snap AS (
+            SELECT column_name, data_type,
+                   CASE is_nullable WHEN true THEN 'YES' WHEN false THEN 'NO' END AS is_nullable,
+                   ordinal_position
+            FROM pipeline_meta.schema_snapshots
+            WHERE table_name = $3
+        )
+        SELECT
+            COALESCE(c.column_name, s.column_name) AS column_name,
+            c.data_type AS cur_type, c.is_nullable AS cur_nullable, c.ordinal_position AS cur_position,
+            s.data_type AS snap_type, s.is_nullable AS snap_nullable, s.ordinal_position AS snap_position,
+            CASE
+                WHEN s.column_name IS NULL THEN 'added'
+                WHEN c.column_name IS NULL THEN 'removed'
+                ELSE 'same'
+            END AS drift
+        FROM cur c
+        FULL OUTER JOIN snap s ON s.column_name = c.column_name;
     """
-    snapshot = execute_query(snapshot_sql, (table_name,))
-
-    # Detect drift
-    current_cols = {c["column_name"] for c in current}
-    snapshot_cols = {c["column_name"] for c in snapshot}
-    added = current_cols - snapshot_cols
-    removed = snapshot_cols - current_cols
+    current, snapshot, added, removed = [], [], [], []
+    for row in execute_prepared("schema_drift", sql, (schema_name, tbl_name, table_name)):
+        name = row["column_name"]
+        if row["drift"] != "removed":
+            current.append({"column_name": name, "data_type": row["cur_type"],
+                            "is_nullable": row["cur_nullable"], "ordinal_position": row["cur_position"]})
+        if row["drift"] != "added":
+            snapshot.append({"column_name": name, "data_type": row["snap_type"],
+                             "is_nullable": row["snap_nullable"], "ordinal_position": row["snap_position"]})
+        if row["drift"] == "added":
+            added.append(name)
+        elif row["drift"] == "removed":
+            removed.append(name)
+    current.sort(key=lambda c: c["ordinal_position"])
+    snapshot.sort(key=lambda c: c["ordinal_position"] or 0)
 
     result = {
         "table": table_name,
         "current_columns": current,
         "snapshot_columns": snapshot,
         "drift_detected": bool(added or removed),
-        "columns_added": list(added),
-        "columns_removed": list(removed),
+        "columns_added": added,
+        "columns_removed": removed,
     }
-    return json.dumps(result, default=str, indent=2)
+    return _dump(result)
 
 
 @tool
+@shared_cache(ttl=5)
 def get_quality_checks(pipeline_name: str) -> str:
     """Get data quality check definitions and their most recent results for a pipeline.
 
@@ -212,10 +386,27 @@ def get_quality_checks(pipeline_name: str) -> str:
             ORDER BY qr2.checked_at DESC
             LIMIT 1
         ) qr ON true
-        WHERE p.pipeline_name = %s AND dqc.is_active = true;
+        WHERE p.pipeline_name = $1 AND dqc.is_active = true;
     """
-    results = execute_query(sql, (pipeline_name,))
-    return json.dumps(results, default=str, indent=2)
+    results = execute_prepared("quality_checks", sql, (pipeline_name,))
+    return _dump(results)
+
+
+_READ_QUERY_RE = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+DIAGNOSTIC_TIMEOUT_MS = 5000
+
+# Recent diagnostic results keyed by query text, oldest first. Queries whose
+# answer depends on the clock or randomness are never cached. The short TTL
+# matches the shared_cache tools, so a re-check after a fix sees the new data.
+DIAGNOSTIC_CACHE_TTL = 5
+DIAGNOSTIC_CACHE_SIZE = 256
+_diag_cache: dict[str, tuple[float, str]] = {}
+_diag_cache_lock = threading.Lock()
+_VOLATILE_SQL_RE = re.compile(
+    r"\b(now|clock_timestamp|statement_timestamp|timeofday|random|gen_random_uuid)\s*\("
+    r"|\b(current_timestamp|current_date|current_time|localtimestamp|localtime)\b",
+    re.IGNORECASE,
+)
 
 
 @tool
@@ -227,25 +418,171 @@ def execute_diagnostic_sql(sql_query: str) -> str:
     Args:
         sql_query: A SELECT SQL query to execute (no INSERT/UPDATE/DELETE).
     """
-    # Safety: only allow SELECT
-    normalized = sql_query.strip().upper()
-    if not normalized.startswith("SELECT") and not normalized.startswith("WITH"):
-        return json.dumps({"error": "Only SELECT/WITH queries allowed for diagnostics."})
+    # Only a friendlier error message; the read-only transaction below is what
+    # actually stops writes, including data-modifying CTEs and volatile functions
+    if not _READ_QUERY_RE.match(sql_query):
+        return _error("Only SELECT/WITH queries allowed for diagnostics.")
+
+    query = sql_query.strip().rstrip(";").rstrip()
+    # A single statement only: a balanced ") x; COMMIT; ..." would otherwise close
+    # the wrapper below, end the read-only transaction and run the rest read-write
+    if ";" in query:
+        return _error("Only a single statement is allowed; remove any ';' from the query.")
+
+    cacheable = not _VOLATILE_SQL_RE.search(query)
+    now = time.monotonic()
+    if cacheable:
+        with _diag_cache_lock:
+            hit = _diag_cache.get(query)
+        if hit is not None and now - hit[0] < DIAGNOSTIC_CACHE_TTL:
+            return hit[1]
+
+    # Cap rows in Postgres rather than after transfer; the 101st row only signals truncation.
+    # The newline keeps a trailing "-- comment" from swallowing the closing parenthesis.
+    capped_sql = f"SELECT * FROM (\n{query}\n) _diag LIMIT 101"
+    try:
+        results = execute_query(capped_sql, read_only=True, timeout_ms=DIAGNOSTIC_TIMEOUT_MS)
+    except Exception as e:
+        return _error(str(e))
+
+    # Limit result size
+    if len(results) > 100:
+        result = _dump({"data": results[:100], "note": "Results truncated to 100 rows"})
+    else:
+        result = _dump({"data": results, "row_count": len(results)})
+    if cacheable:
+        with _diag_cache_lock:
+            _diag_cache.pop(query, None)
+            _diag_cache[query] = (now, result)
+            if len(_diag_cache) > DIAGNOSTIC_CACHE_SIZE:
+                del _diag_cache[next(iter(_diag_cache))]
+    return result
+
+
+# Agent actions waiting to be written by the background flusher. Each entry is
+# an action's parameter tuple, or an Event a caller is waiting on to know that
+# everything queued before it has been written.
+ACTION_BATCH_SIZE = 50
+ACTION_FLUSH_INTERVAL = 1.0
+_action_queue: queue.Queue = queue.Queue(maxsize=1000)
+_action_flusher: Optional[threading.Thread] = None
+_action_flusher_lock = threading.Lock()
+
+_INSERT_ACTION_SQL = """
+    INSERT INTO pipeline_meta.agent_actions
+        (agent_name, action_type, pipeline_id, summary, details, confidence_score)
+    VALUES (%s, %s, %s, %s, %s::jsonb, %s)
+"""
 
-    forbidden = ["INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "TRUNCATE", "CREATE"]
-    for word in forbidden:
-        if word in normalized:
-            return json.dumps({"error": f"Forbidden keyword detected: {word}"})
+# pipeline_name -> (lookup time, pipeline_id); the mapping almost never changes
+PIPELINE_ID_TTL = 60
+_pipeline_ids: dict[str, tuple[float, int]] = {}
+_pipeline_ids_lock = threading.Lock()
 
+
+def _pipeline_id(pipeline_name: Optional[str]) -> Optional[int]:
+    """Resolve a pipeline name to its id, cached for PIPELINE_ID_TTL seconds.
+
+    Unknown names are not cached and resolve to None, which logs the action
+    without a pipeline as the old inline sub-select did.
+    """
+    if not pipeline_name:
+        return None
+    now = time.monotonic()
+    with _pipeline_ids_lock:
+        hit = _pipeline_ids.get(pipeline_name)
+    if hit is not None and now - hit[0] < PIPELINE_ID_TTL:
+        return hit[1]
+
+    rows = execute_prepared(
+        "pipeline_id", "SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = $1", (pipeline_name,)
+    )
+    if not rows:
+        return None
+    with _pipeline_ids_lock:
+        _pipeline_ids[pipeline_name] = (now, rows[0]["pipeline_id"])
+    return rows[0]["pipeline_id"]
+
+
+def _action_row(action: tuple) -> tuple:
+    """Swap a queued action's pipeline name for its id, giving _INSERT_ACTION_SQL's parameters."""
+    agent_name, action_type, pipeline_name, summary, details, confidence_score = action
+    return agent_name, action_type, _pipeline_id(pipeline_name), summary, details, confidence_score
+
+
+def _insert_actions(batch: list[tuple]) -> None:
+    """Write queued actions with one multi-row INSERT, falling back to row by row."""
+    values = ", ".join(["(%s, %s, %s, %s, %s::jsonb, %s)"] * len(batch))
+    sql = f"""
+        INSERT INTO pipeline_meta.agent_actions
+            (agent_name, action_type, pipeline_id, summary, details, confidence_score)
+        VALUES {values};
+    """
     try:
-        results = execute_query(sql_query, read_only=True)
-        # Limit result size
-        if len(results) > 100:
-            results = results[:100]
-            return json.dumps({"data": results, "note": "Results truncated to 100 rows"}, default=str, indent=2)
-        return json.dumps({"data": results, "row_count": len(results)}, default=str, indent=2)
-    except Exception as e:
-        return json.dumps({"error": str(e)})
+        execute_write(sql, tuple(param for action in batch for param in _action_row(action)))
+        return
+    except Exception:
+        if len(batch) == 1:
+            logger.exception("Failed to log agent action %r", batch[0][:4])
+            return
+        logger.warning("Batched agent action insert failed; retrying row by row", exc_info=True)
+    # Keep the good rows when one bad row sinks the batch
+    for action in batch:
+        try:
+            execute_write(_INSERT_ACTION_SQL, _action_row(action))
+        except Exception:
+            logger.exception("Failed to log agent action %r", action[:4])
+
+
+def _flush_actions_forever() -> None:
+    """Drain the action queue in batches of up to ACTION_BATCH_SIZE or ACTION_FLUSH_INTERVAL seconds."""
+    while True:
+        item = _action_queue.get()
+        batch: list[tuple] = []
+        waiter = None
+        deadline = time.monotonic() + ACTION_FLUSH_INTERVAL
+        while True:
+            if isinstance(item, threading.Event):
+                waiter = item
+                break
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= ACTION_BATCH_SIZE or remaining <= 0:
+                break
+            try:
+                item = _action_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if batch:
+            _insert_actions(batch)
+        if waiter is not None:
+            waiter.set()
+
+
+def _ensure_action_flusher() -> None:
+    """Start the background flusher on first use."""
+    global _action_flusher
+    if _action_flusher is not None:
+        return
+    with _action_flusher_lock:
+        if _action_flusher is None:
+            # The pool registers its own atexit close when it is created; creating it
+            # first means our final flush runs before it (atexit is LIFO)
+            init_pool()
+            atexit.register(flush_agent_actions)
+            _action_flusher = threading.Thread(
+                target=_flush_actions_forever, name="agent-action-flusher", daemon=True
+            )
+            _action_flusher.start()
+
+
+def flush_agent_actions(timeout: float = 5.0) -> None:
+    """Block until every action queued so far has been written (or timeout seconds pass)."""
+    if _action_flusher is None:
+        return
+    done = threading.Event()
+    _action_queue.put(done)
+    done.wait(timeout)
 
 
 @tool
@@ -256,6 +593,7 @@ def log_agent_action(
     summary: str,
     details: str = "{}",
     confidence_score: float = 0.0,
+    flush: bool = False,
 ) -> str:
     """Log an action taken by an agent for audit trail and dashboard display.
 
@@ -266,48 +604,51 @@ def log_agent_action(
         summary: Brief human-readable summary of the action.
         details: JSON string with detailed information.
         confidence_score: Agent's confidence in this action (0.0 to 1.0).
-    """
-    sql = """
-        INSERT INTO pipeline_meta.agent_actions
-            (agent_name, action_type, pipeline_id, summary, details, confidence_score)
-        VALUES (
-            %s, %s,
-            (SELECT pipeline_id FROM pipeline_meta.pipelines WHERE pipeline_name = %s),
-            %s, %s::jsonb, %s
-        )
-        RETURNING action_id, created_at;
+        flush: Write the action now and return its id, instead of queueing it.
     """
+    try:
+        orjson.loads(details)
+    except orjson.JSONDecodeError as e:
+        return _error(f"details is not valid JSON: {e}")
+
+    action = (agent_name, action_type, pipeline_name, summary, details, confidence_score)
+    if not flush:
+        _ensure_action_flusher()
+        try:
+            _action_queue.put_nowait(action)
+            return _dump({"logged": True, "queued": True})
+        except queue.Full:
+            pass  # Flusher is behind; write this one synchronously
+
+    # Keep the audit trail in order: anything queued earlier goes in first
+    flush_agent_actions()
     try:
         result = execute_query(
-            sql,
-            (agent_name, action_type, pipeline_name, summary, details, confidence_score),
-            read_only=False,
+            _INSERT_ACTION_SQL + "RETURNING action_id, created_at;", _action_row(action), read_only=False
         )
-        return json.dumps({"logged": True, "action": result[0] if result else {}}, default=str)
+        return _dump({"logged": True, "action": result[0] if result else {}})
     except Exception as e:
-        return json.dumps({"error": str(e)})
+        return _error(str(e))
 
 
 @tool
 def list_dbt_models() -> str:
     """List all available dbt models with their file paths and categories (staging/marts).
     Use this to discover what dbt models exist in the project."""
-    models = []
     models_dir = os.path.join(DBT_PROJECT_PATH, "models")
     if not os.path.exists(models_dir):
-        return json.dumps({"error": f"dbt models directory not found at {models_dir}"})
+        return _error(f"dbt models directory not found at {models_dir}")
 
-    for root, dirs, files in os.walk(models_dir):
-        for f in files:
-            if f.endswith(".sql"):
-                rel_path = os.path.relpath(os.path.join(root, f), DBT_PROJECT_PATH)
-                category = os.path.basename(root)
-                models.append({
-                    "model_name": f.replace(".sql", ""),
-                    "category": category,
-                    "path": rel_path,
-                })
-    return json.dumps(models, indent=2)
+    global _models_json
+    index = _get_model_index()
+    cached = _models_json
+    if cached is None or cached[0] is not index:
+        models = [
+            {"model_name": name, "category": category, "path": rel_path}
+            for name, (_, rel_path, category) in index.items()
+        ]
+        cached = _models_json = (index, _dump(models))
+    return cached[1]
 
 
 @tool
@@ -321,37 +662,32 @@ def get_dbt_model_sql(model_name: str) -> str:
     """
     models_dir = os.path.join(DBT_PROJECT_PATH, "models")
     if not os.path.exists(models_dir):
-        return json.dumps({"error": "dbt models directory not found"})
+        return _error("dbt models directory not found")
 
-    for root, dirs, files in os.walk(models_dir):
-        for f in files:
-            if f == f"{model_name}.sql":
-                filepath = os.path.join(root, f)
-                with open(filepath, "r") as fh:
-                    sql_content = fh.read()
-                return json.dumps({
-                    "model_name": model_name,
-                    "path": os.path.relpath(filepath, DBT_PROJECT_PATH),
-                    "sql": sql_content,
-                }, indent=2)
+    entry = _get_model_index().get(model_name)
+    if entry is not None:
+        filepath, rel_path, _ = entry
+        return _render_model_sql(model_name, filepath, rel_path, os.stat(filepath).st_mtime_ns)
 
-    return json.dumps({"error": f"Model '{model_name}' not found in dbt project"})
+    return _error(f"Model '{model_name}' not found in dbt project")
 
 
 @tool
+@shared_cache(ttl=10)
 def get_monitored_tables() -> str:
     """Get all tables that have schema snapshots for drift monitoring.
     Returns the list of tables being tracked for schema changes."""
+    # One row holding the whole list, so it is encoded straight from the array
     sql = """
-        SELECT DISTINCT table_name
-        FROM pipeline_meta.schema_snapshots
-        ORDER BY table_name;
+        SELECT COALESCE(array_agg(DISTINCT table_name ORDER BY table_name), '{}') AS tables
+        FROM pipeline_meta.schema_snapshots;
     """
-    results = execute_query(sql)
-    return json.dumps([r["table_name"] for r in results], indent=2)
+    results = execute_prepared("monitored_tables", sql)
+    return _dump(results[0]["tables"])
 
 
 @tool
+@shared_cache(ttl=10)
 def get_pipelines_with_quality_checks() -> str:
     """Get all pipelines that have data quality checks defined.
     Returns pipeline names and their check counts."""
@@ -365,8 +701,8 @@ def get_pipelines_with_quality_checks() -> str:
         GROUP BY p.pipeline_name
         ORDER BY p.pipeline_name;
     """
-    results = execute_query(sql)
-    return json.dumps(results, default=str, indent=2)
+    results = execute_prepared("pipelines_with_checks", sql)
+    return _dump(results)
 
 
 @tool
@@ -380,30 +716,30 @@ def apply_dbt_model_fix(model_name: str, new_sql: str) -> str:
     """
     models_dir = os.path.join(DBT_PROJECT_PATH, "models")
     if not os.path.exists(models_dir):
-        return json.dumps({"error": "dbt models directory not found"})
-
-    for root, dirs, files in os.walk(models_dir):
-        for f in files:
-            if f == f"{model_name}.sql":
-                filepath = os.path.join(root, f)
-                # Backup original
-                backup_path = filepath + ".backup"
-                with open(filepath, "r") as fh:
-                    original = fh.read()
-                with open(backup_path, "w") as fh:
-                    fh.write(original)
-                # Write new SQL
-                with open(filepath, "w") as fh:
-                    fh.write(new_sql)
-                return json.dumps({
-                    "applied": True,
-                    "model_name": model_name,
-                    "path": os.path.relpath(filepath, DBT_PROJECT_PATH),
-                    "backup_path": os.path.relpath(backup_path, DBT_PROJECT_PATH),
-                    "message": f"Fix applied to {model_name}. Backup saved. Run dbt to compile.",
-                }, indent=2)
-
-    return json.dumps({"error": f"Model '{model_name}' not found in dbt project"})
+        return _error("dbt models directory not found")
+
+    entry = _get_model_index().get(model_name)
+    if entry is not None:
+        filepath, rel_path, _ = entry
+        # Backup original
+        backup_path = filepath + ".backup"
+        with open(filepath, "r") as fh:
+            original = fh.read()
+        with open(backup_path, "w") as fh:
+            fh.write(original)
+        # Write new SQL
+        with open(filepath, "w") as fh:
+            fh.write(new_sql)
+        clear_shared_state()
+        return _dump({
+            "applied": True,
+            "model_name": model_name,
+            "path": rel_path,
+            "backup_path": os.path.relpath(backup_path, DBT_PROJECT_PATH),
+            "message": f"Fix applied to {model_name}. Backup saved. Run dbt to compile.",
+        })
+
+    return _error(f"Model '{model_name}' not found in dbt project")
 
 
 @tool
@@ -416,7 +752,6 @@ def run_dbt_model(model_name: str) -> str:
         model_name: Name of the dbt model to run (e.g., 'stg_orders'). Use '+' suffix to include downstream.
     """
     import subprocess
-    import time
     start_time = time.time()
     try:
         result = subprocess.run(
@@ -427,6 +762,8 @@ def run_dbt_model(model_name: str) -> str:
         )
         duration = int(time.time() - start_time)
         success = result.returncode == 0
+        # dbt may have rebuilt tables whose schema is cached
+        clear_shared_state()
 
         # Record run results for each model that was part of the run
         # Parse stdout for model names (lines like "OK created sql view model public_staging.stg_orders")
@@ -462,17 +799,28 @@ def run_dbt_model(model_name: str) -> str:
             except Exception:
                 pass  # Don't fail the tool if logging fails
 
-        return json.dumps({
+        return _dump({
             "success": success,
             "models_run": models_run,
             "duration_seconds": duration,
             "stdout": result.stdout[-2000:] if result.stdout else "",
             "stderr": result.stderr[-2000:] if result.stderr else "",
-        }, indent=2)
+        })
     except subprocess.TimeoutExpired:
-        return json.dumps({"error": "dbt run timed out after 120 seconds"})
+        return _error("dbt run timed out after 120 seconds")
     except Exception as e:
-        return json.dumps({"error": str(e)})
+        return _error(str(e))
+
+
+def evict_cached_fixes(pipeline_name: str) -> None:
+    """Drop cached Repair Agent proposals for a pipeline whose fix was rolled back or failed verification."""
+    try:
+        execute_write(
+            "DELETE FROM pipeline_meta.fix_cache WHERE diagnosis->'affected_pipelines' ? %s",
+            (pipeline_name,),
+        )
+    except Exception:
+        logger.warning("Failed to evict cached fixes for %s", pipeline_name, exc_info=True)
 
 
 @tool
@@ -482,25 +830,26 @@ def rollback_dbt_model(model_name: str) -> str:
     Args:
         model_name: Name of the dbt model to rollback (e.g., 'stg_orders').
     """
-    models_dir = os.path.join(DBT_PROJECT_PATH, "models")
-    for root, dirs, files in os.walk(models_dir):
-        for f in files:
-            if f == f"{model_name}.sql":
-                filepath = os.path.join(root, f)
-                backup_path = filepath + ".backup"
-                if not os.path.exists(backup_path):
-                    return json.dumps({"error": f"No backup found for {model_name}"})
-                with open(backup_path, "r") as fh:
-                    original = fh.read()
-                with open(filepath, "w") as fh:
-                    fh.write(original)
-                os.remove(backup_path)
-                return json.dumps({
-                    "rolled_back": True,
-                    "model_name": model_name,
-                    "message": f"{model_name} restored from backup.",
-                })
-    return json.dumps({"error": f"Model '{model_name}' not found"})
+    entry = _get_model_index().get(model_name)
+    if entry is not None:
+        filepath = entry[0]
+        backup_path = filepath + ".backup"
+        if not os.path.exists(backup_path):
+            return _error(f"No backup found for {model_name}")
+        with open(backup_path, "r") as fh:
+            original = fh.read()
+        with open(filepath, "w") as fh:
+            fh.write(original)
+        os.remove(backup_path)
+        clear_shared_state()
+        # The fix that was just undone must not be proposed again from the cache
+        evict_cached_fixes(model_name)
+        return _dump({
+            "rolled_back": True,
+            "model_name": model_name,
+            "message": f"{model_name} restored from backup.",
+        })
+    return _error(f"Model '{model_name}' not found")
 
 
 @tool
@@ -512,6 +861,7 @@ def get_agent_action_history(pipeline_name: str = None, limit: int = 50) -> str:
         pipeline_name: Optional filter by pipeline name. If None, returns all actions.
         limit: Maximum number of actions to return.
     """
+    flush_agent_actions()
     if pipeline_name:
         sql = """
             SELECT
@@ -536,13 +886,12 @@ def get_agent_action_history(pipeline_name: str = None, limit: int = 50) -> str:
             LIMIT %s;
         """
         results = execute_query(sql, (limit,))
-    return json.dumps(results, default=str, indent=2)
+    return _dump(results)
 
 
-@tool
-def get_failure_patterns() -> str:
-    """Analyze historical agent actions to find recurring failure patterns.
-    Returns pipelines that fail frequently, common root causes, and trends."""
+def failure_pattern_rows() -> list[dict]:
+    """Per-pipeline failure and fix counts; shared by get_failure_patterns and the /patterns API."""
+    flush_agent_actions()
     sql = """
         WITH failure_counts AS (
             SELECT
@@ -576,8 +925,14 @@ def get_failure_patterns() -> str:
         LEFT JOIN fix_counts fxc ON fxc.pipeline_name = fc.pipeline_name
         ORDER BY fc.failure_count DESC;
     """
-    results = execute_query(sql)
-    return json.dumps(results, default=str, indent=2)
+    return execute_prepared("failure_patterns", sql)
+
+
+@tool
+def get_failure_patterns() -> str:
+    """Analyze historical agent actions to find recurring failure patterns.
+    Returns pipelines that fail frequently, common root causes, and trends."""
+    return _dump(failure_pattern_rows())
 
 
 # Collect all tools for agent use
@@ -0,0 +1,48 @@
+"""Tests for parsing the confidence line out of a diagnosis."""
+
+import pytest
+
+pytest.importorskip("strands")
+pytest.importorskip("psycopg2")
+
+from src.agents.diagnostics import parse_confidence  # noqa: E402
+
+
+def test_uses_the_last_confidence_line():
+    diagnosis = (
+        "Earlier diagnosis reported Confidence: 0.2\n"
+        "Root cause: stg_orders does not select discount_amount.\n"
+        "**Confidence**: 0.9\n"
+    )
+    assert parse_confidence(diagnosis) == 0.9
+
+
+def test_closing_lines_after_the_confidence():
+    assert parse_confidence("Confidence: 0.9\nRecommended fix: add the column.") == pytest.approx(0.9)
+    assert parse_confidence("```\nConfidence: 0.7\n```") == pytest.approx(0.7)
+
+
+def test_annotated_confidence():
+    assert parse_confidence("Confidence: 0.85 (high)") == pytest.approx(0.85)
+    assert parse_confidence("Overall confidence: 0.9") == pytest.approx(0.9)
+    assert parse_confidence("Confidence (0.0 to 1.0): 0.6") == pytest.approx(0.6)
+
+
+def test_ignores_confidence_outside_the_tail():
+    diagnosis = "Confidence: 0.9\n" + "\n".join(f"Evidence line {i}" for i in range(6))
+    assert parse_confidence(diagnosis) is None
+
+
+def test_unparseable_confidence():
+    assert parse_confidence("Root cause: unknown.") is None
+    assert parse_confidence("Confidence: high") is None
+    assert parse_confidence("Confidence: 3/0") is None
+
+
+def test_out_of_ten():
+    assert parse_confidence("Root cause: schema drift.\nConfidence: 8/10") == pytest.approx(0.8)
+
+
+def test_percent_and_fraction():
+    assert parse_confidence("Confidence: 80%") == pytest.approx(0.8)
+    assert parse_confidence("- confidence score = 0.75.") == pytest.approx(0.75)